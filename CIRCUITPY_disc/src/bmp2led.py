@@ -11,9 +11,21 @@ BMP-to-DotStar-ready-bytearrays.
 # pylint: disable=import-error
 import os
 import math
+import json
 import ulab
 
+from control_frames import frame_off
+
 BUFFER_ROWS = 32
+# BMP rows per readinto() in read_columns()
+READ_BLOCK_ROWS = 16
+# Interpolation steps between two BMP rows in lookup-table mode.
+# 16 steps * 255 gives a 4081 entry table (8 KByte of uint16).
+LUT_BLEND_STEPS = 16
+# Steps of the APA102 5-bit global brightness field used in HDR mode.
+HDR_LEVELS = 31
+# Format version of the scandir() header index file.
+SCAN_INDEX_VERSION = 1
 
 class BMPError(Exception):
     """Used for raising errors in the BMP2LED Class."""
@@ -51,7 +63,8 @@ class BMP2LED:
     Intended for light painting projects.
     """
 
-    def __init__(self, pixel_count, color_order='brg', gamma=2.4):
+    def __init__(self, pixel_count, color_order='brg', gamma=2.4,
+                 use_lut=True, hdr=False):
         """
         Constructor for BMP2LED Class. Arguments are values that are not
         expected to change over the life of the object.
@@ -62,6 +75,14 @@ class BMP2LED:
             gamma (float)    : Optional gamma-correction constant, for
                                more perceptually-linear output.
                                Optional; 2.4 if unspecified.
+            use_lut (boolean) : If True, process() converts rows with integer
+                               table lookups instead of per-row float gamma
+                               math. Optional; True if unspecified.
+            hdr (boolean)     : If True, process() splits every pixel value
+                               between the 5-bit global brightness field and
+                               the 8-bit color channels (13 bit resolution),
+                               keeping detail in dark images / at low
+                               brightness. Optional; False if unspecified.
         """
         color_order = color_order.lower()
         self.red_index = color_order.find('r')
@@ -69,8 +90,19 @@ class BMP2LED:
         self.blue_index = color_order.find('b')
         self.pixel_count = pixel_count
         self.gamma = gamma
+        self.use_lut = use_lut
+        self.hdr = hdr
         self.bmp_file = None
         self.bmp_specs = None
+        # BMPSpecs of the images found by the last scandir(), by filename
+        self.image_specs = {}
+        self.lut = None
+        self.lut_key = None
+        # Conversion watermark (see process_iter())
+        self.rows_done = 0
+        self.rows_total = None
+        # Result of the last read_columns_iter()
+        self.columns_result = None
 
 
     def read_le(self, num_bytes):
@@ -89,6 +121,68 @@ class BMP2LED:
         return result
 
 
+    @property
+    def dotstar_row_size(self):
+        """
+        Size in bytes of one DotStar-ready row (header, pixels, footer),
+        as written by process().
+        """
+        return 4 + 4 * self.pixel_count + (self.pixel_count + 15) // 16
+
+
+    @staticmethod
+    def bytes_free(path='/'):
+        """
+        Determine free space on drive.
+        Arguments:
+            path (string) : Any path on the drive to check.
+        Returns:
+            Free space in bytes.
+        """
+        stats = os.statvfs(path)
+        return stats[0] * stats[4]   # block size, free blocks
+
+
+    @staticmethod
+    def cluster_size(path='/'):
+        """
+        Determine the allocation unit of the drive (FAT cluster size).
+        Reads that are whole clusters avoid partial sector handling.
+        Arguments:
+            path (string) : Any path on the drive to check.
+        Returns:
+            Cluster size in bytes.
+        """
+        return os.statvfs(path)[0]
+
+
+    def gamma_table(self, brightness=1.0):
+        """
+        Get lookup table for the integer conversion path of process().
+        The table is only rebuilt if gamma or brightness changed since
+        the last call.
+        Arguments:
+            brightness (float) : Overall brightness adjustment, 0.0 to 1.0.
+        Returns:
+            uint16 ndarray. Index is the blended pixel value
+            (0 to 255 * LUT_BLEND_STEPS), entry is the gamma and brightness
+            corrected output value in 8.8 fixed point (0 to 254.999 * 256).
+            The fractional byte is what error diffusion accumulates.
+        """
+        key = (self.gamma, brightness)
+        if self.lut_key != key:
+            # Release old table before allocating the new one
+            self.lut = None
+            steps = ulab.numpy.arange(255 * LUT_BLEND_STEPS + 1,
+                                      dtype=ulab.numpy.float)
+            self.lut = ulab.numpy.array(
+                ((steps * (brightness / (255 * LUT_BLEND_STEPS))) **
+                 self.gamma) * (254.999 * 256),
+                dtype=ulab.numpy.uint16)
+            self.lut_key = key
+        return self.lut
+
+
     def read_header(self):
         """
         Read and validate BMP file heaader. Throws exception if file
@@ -123,31 +217,122 @@ class BMP2LED:
         return BMPSpecs(width, height, image_offset, flip)
 
 
-    def scandir(self, path):
+    def specs(self, filename):
+        """
+        BMPSpecs of an image - from the last scandir() if available,
+        otherwise the file header is read.
+        Arguments:
+            filename (string) : Full path and filename of BMP image
+                                (as scandir() path + '/' + name).
+        """
+        specs = self.image_specs.get(filename)
+        if specs is None:
+            with open(filename, 'rb') as self.bmp_file:
+                specs = self.read_header()
+        return specs
+
+
+    def scandir(self, path, index_filename=None):
         """
         Scan a given path, looking for compatible BMP image files.
         Arguments:
-            path (string) : Directory to search. If '', root path is used.
+            path (string)           : Directory to search. If '', root path
+                                      is used.
+            index_filename (string) : Optional persistent header index
+                                      (json). Files whose size and mtime
+                                      match the index are not opened and
+                                      parsed again. The index is rewritten
+                                      only if something changed (and
+                                      silently not at all if the
+                                      filesystem is read-only).
         Returns:
             List of compatible BMP filenames within path. Path is NOT
             included in names. Subdirectories, non-BMP files and unsupported
             BMP formats (e.g. compressed or paletted) are skipped.
             List will be alphabetically sorted.
+            BMPSpecs of the listed files are available in self.image_specs
+            (by full filename - path + '/' + name).
         """
-        full_list = os.listdir(path)
+        index = {}
+        if index_filename:
+            index = self.load_scan_index(index_filename, path)
+        # Index entries: [size, mtime] for files that are not compatible,
+        # [size, mtime, width, height, image_offset, flip] for BMPs.
+        files = {}
+        changed = False
+        self.image_specs = {}
         valid_list = []
-        for entry in full_list:
+        try:
+            entries = os.listdir(path)
+        except OSError:
+            # no image folder - nothing to list
+            # (the painter falls back to patterns, texts and animations)
+            return valid_list
+        for entry in entries:
+            filename = path + '/' + entry
             try:
-                with open(path + '/' + entry, 'rb') as self.bmp_file:
-                    self.read_header()
-                    valid_list.append(entry)
-            except (OSError, BMPError):
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            if stat[0] & 0x4000: # Skip directories
                 continue
+            info = index.get(entry)
+            if info is None or info[0] != stat[6] or info[1] != stat[8]:
+                info = [stat[6], stat[8]]
+                try:
+                    with open(filename, 'rb') as self.bmp_file:
+                        specs = self.read_header()
+                    info += [specs.width, specs.height, specs.image_offset,
+                             specs.flip]
+                except (OSError, BMPError):
+                    pass
+                changed = True
+            files[entry] = info
+            if len(info) > 2:
+                self.image_specs[filename] = BMPSpecs(*info[2:])
+                valid_list.append(entry)
+
+        if index_filename and (changed or len(files) != len(index)):
+            self.save_scan_index(index_filename, path, files)
 
         valid_list.sort() # Alphabetize
         return valid_list
 
 
+    @staticmethod
+    def load_scan_index(index_filename, path):
+        """
+        Read header index written by save_scan_index().
+        Returns:
+            Dict of index entries by filename; empty if there is no index
+            file or it does not belong to path.
+        """
+        try:
+            with open(index_filename, 'r') as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+        if (index.get('version') != SCAN_INDEX_VERSION or
+                index.get('path') != path):
+            return {}
+        return index.get('files', {})
+
+
+    @staticmethod
+    def save_scan_index(index_filename, path, files):
+        """
+        Write header index for scandir().
+        """
+        try:
+            with open(index_filename, 'w') as index_file:
+                json.dump({'version': SCAN_INDEX_VERSION,
+                           'path': path,
+                           'files': files}, index_file)
+        except OSError:
+            # Read-only filesystem - scan again next time.
+            pass
+
+
     def read_row(self, row, dest):
         """
         Read one row of pixels from BMP file, clipped to minimum of BMP
@@ -168,11 +353,400 @@ class BMP2LED:
         self.bmp_file.readinto(dest)
 
 
+    @staticmethod
+    def column_frame_size(height):
+        """
+        Size in bytes of one column in read_columns() layout: a complete
+        SPI transaction of 4 byte start frame, 4 bytes per pixel and
+        end frame.
+        """
+        return 4 + 4 * height + max(4, (height + 15) // 16)
+
+
+    @staticmethod
+    def set_pixel_headers(buffer, height, pixel_header):
+        """
+        Set the per pixel start bytes of all columns in a read_columns()
+        buffer, e.g. to change the global brightness without reloading.
+        Arguments:
+            buffer (bytearray) : Buffer returned by read_columns().
+            height (int)       : Pixels per column.
+            pixel_header (int) : 0xE0 | 5-bit global brightness.
+        """
+        column_size = BMP2LED.column_frame_size(height)
+        view = ulab.numpy.frombuffer(buffer, dtype=ulab.numpy.uint8)
+        # One strided assignment per pixel row, across all columns
+        for pixel in range(height):
+            view[4 + pixel * 4::column_size] = pixel_header
+
+
+    @staticmethod
+    def halve_columns(buffer, height):
+        """
+        Half resolution copy of a read_columns() buffer: every two
+        neighbouring columns are averaged into one (a trailing odd column
+        is dropped). Pixel start bytes, start and end frames stay as they
+        are - they are the same in both columns.
+        Blocks until done; see halve_columns_iter() for a non-blocking
+        variant.
+        Arguments:
+            buffer (bytearray) : Buffer returned by read_columns().
+            height (int)       : Pixels per column.
+        Returns: tuple of new bytearray and number of columns.
+        """
+        column_size = BMP2LED.column_frame_size(height)
+        count = len(buffer) // column_size // 2
+        result = bytearray(count * column_size)
+        for _ in BMP2LED.halve_columns_iter(buffer, height, result):
+            pass
+        return result, count
+
+    @staticmethod
+    def halve_columns_iter(buffer, height, result, block_columns=16):
+        """
+        Average every two neighbouring columns of buffer into result
+        (see halve_columns()).
+        Arguments:
+            buffer (bytearray) : Buffer returned by read_columns().
+            height (int)       : Pixels per column.
+            result (bytearray) : Output buffer, room for
+                                 len(buffer) // column_size // 2 columns.
+            block_columns (int): Output columns per step.
+        Yields: progress as float ranging from 0.0 (start) to 1.0 (end)
+                once per block of columns - so the caller can spread the
+                work over several time slices.
+        """
+        column_size = BMP2LED.column_frame_size(height)
+        count = len(result) // column_size
+        view = ulab.numpy.frombuffer(buffer, dtype=ulab.numpy.uint8)
+        output = ulab.numpy.frombuffer(result, dtype=ulab.numpy.uint8)
+        for column in range(count):
+            start = 2 * column * column_size
+            left = ulab.numpy.array(view[start:start + column_size],
+                                    dtype=ulab.numpy.uint16)
+            right = view[start + column_size:start + 2 * column_size]
+            # +1 → round half up
+            output[column * column_size:(column + 1) * column_size] = (
+                ulab.numpy.array((left + right + 1) / 2,
+                                 dtype=ulab.numpy.uint8))
+            if (column + 1) % block_columns == 0:
+                yield (column + 1) / count
+        yield 1.0
+
+
+    def read_columns(self, input_filename, brightness=1.0, pixel_header=0xFF,
+                     callback=None):
+        """
+        Read a 24-bit uncompressed BMP file into one bytearray of DotStar
+        data. Blocks until the whole image is read; see read_columns_iter()
+        for arguments and for a non-blocking variant.
+        Arguments:
+            callback (func) : Callback function for displaying load
+                              progress, will be passed a float
+                              ranging from 0.0 (start) to 1.0 (end)
+                              once per block of rows.
+        Returns: tuple of bytearray, image width (= number of columns) and
+                 image height (= pixels per column).
+        """
+        for progress in self.read_columns_iter(input_filename, brightness,
+                                               pixel_header):
+            if callback:
+                callback(progress)
+        return self.columns_result
+
+
+    # pylint: disable=too-many-locals,too-many-arguments
+    def read_columns_iter(self, input_filename, brightness=1.0,
+                          pixel_header=0xFF, column_start=0,
+                          column_count=None):
+        """
+        Read a 24-bit uncompressed BMP file into one bytearray of DotStar
+        data for painting straight from RAM. The image is stored column
+        after column (column-major). Every column is one complete SPI
+        transaction (see column_frame_size()): start frame, one pixel
+        (start byte + 3 color bytes in DotStar order) per BMP row, bottom
+        row first, and end frame - so it can be written to the strip
+        with a single write() of a memoryview slice.
+        No interpolation / dithering, gamma and brightness are
+        applied through a 256 entry table.
+        Rows are read in blocks of READ_BLOCK_ROWS with readinto() and
+        transposed with strided ulab assignments - no per pixel Python code.
+        Arguments:
+            input_filename (string) : Full path and filename of BMP image.
+            brightness (float)      : Overall brightness adjustment, from
+                                      0.0 (off) to 1.0 (maximum).
+            pixel_header (int)      : Per pixel start byte
+                                      (0xE0 | 5-bit global brightness).
+            column_start (int)      : First image column to read.
+            column_count (int)      : Number of columns to read, None for
+                                      all columns from column_start on.
+        Yields: load progress as float ranging from 0.0 (start) to 1.0 (end)
+                once per block of rows - so the caller can spread the
+                loading over several time slices.
+        When done, self.columns_result holds the tuple of bytearray, number
+        of columns read (image width if reading all) and image height
+        (= pixels per column).
+        Column n starts at n * column_frame_size(height).
+        """
+        self.columns_result = None
+        with open(input_filename, 'rb') as self.bmp_file:
+            self.bmp_specs = self.read_header()
+            width = self.bmp_specs.width
+            height = self.bmp_specs.height
+            row_size = self.bmp_specs.row_size
+            column_size = self.column_frame_size(height)
+            if column_count is None:
+                column_count = width - column_start
+            column_count = max(0, min(column_count, width - column_start))
+            data_start = column_start * 3
+            data_end = data_start + column_count * 3
+
+            # its huge! but its also fast :)
+            # (start and end frames are all zero)
+            buffer = bytearray(column_count * column_size)
+            view = ulab.numpy.frombuffer(buffer, dtype=ulab.numpy.uint8)
+            self.set_pixel_headers(buffer, height, pixel_header)
+
+            lut = ulab.numpy.array(
+                ((ulab.numpy.arange(256, dtype=ulab.numpy.float) *
+                  (brightness / 255)) ** self.gamma) * 255 + 0.5,
+                dtype=ulab.numpy.uint8)
+
+            block_rows = min(READ_BLOCK_ROWS, height)
+            block = ulab.numpy.zeros(block_rows * row_size,
+                                     dtype=ulab.numpy.uint8)
+            # BMP pixel data is contiguous - one seek, then read on
+            self.bmp_file.seek(self.bmp_specs.image_offset)
+            for block_start in range(0, height, block_rows):
+                self.bmp_file.readinto(block)
+                for block_row in range(min(block_rows, height - block_start)):
+                    file_row = block_start + block_row
+                    # Normal BMPs are stored bottom-to-top,
+                    # bottom row goes to the first pixel.
+                    if self.bmp_specs.flip:
+                        pixel = file_row
+                    else:
+                        pixel = height - 1 - file_row
+                    offset = block_row * row_size
+                    values = ulab.numpy.take(
+                        lut, block[offset + data_start:offset + data_end])
+                    # Transpose: this row is one pixel in every column.
+                    start = 4 + pixel * 4 + 1
+                    view[start + self.blue_index::column_size] = values[0::3]
+                    view[start + self.green_index::column_size] = values[1::3]
+                    view[start + self.red_index::column_size] = values[2::3]
+                yield min(block_start + block_rows, height) / height
+        self.columns_result = (buffer, column_count, height)
+
+
+    # pylint: disable=too-many-arguments
+    def write_columns(self, input_filename, output_filename, brightness=1.0,
+                      pixel_header=0xFF, chunk_columns=32, callback=None):
+        """
+        Convert a BMP file to a file in read_columns() layout, for images
+        that do not fit into RAM. Only chunk_columns columns are held in
+        RAM at a time (the BMP file is read once per chunk).
+        Arguments:
+            input_filename (string)  : Full path and filename of BMP image.
+            output_filename (string) : Full path and filename of output file.
+                                       EXISTING FILE WILL BE OVERWRITTEN.
+            brightness (float)       : see read_columns_iter().
+            pixel_header (int)       : see read_columns_iter().
+            chunk_columns (int)      : Columns converted per chunk.
+            callback (func)          : Callback function for displaying
+                                       progress, will be passed a float
+                                       ranging from 0.0 to 1.0 once per chunk.
+        Returns: tuple of image width (= number of columns) and
+                 image height (= pixels per column).
+        """
+        specs = self.specs(input_filename)
+        with open(output_filename, 'wb') as output_file:
+            for column_start in range(0, specs.width, chunk_columns):
+                for _ in self.read_columns_iter(
+                        input_filename, brightness, pixel_header,
+                        column_start, chunk_columns):
+                    pass
+                output_file.write(self.columns_result[0])
+                self.columns_result = None
+                if callback:
+                    callback(min(column_start + chunk_columns, specs.width) /
+                             specs.width)
+        return specs.width, specs.height
+
+
+    # pylint: disable=too-many-arguments
+    def convert_row_float(self, row_a_data, row_a_weight,
+                          row_b_data, row_b_weight, brightness, err):
+        """
+        Interpolate, gamma correct and dither one output row using float
+        math. This is the original conversion path.
+        Arguments:
+            row_a_data (uint8 ndarray) : BMP row 'a' pixel values.
+            row_a_weight (float)       : Interpolation weight of row 'a'.
+            row_b_data (uint8 ndarray) : BMP row 'b' pixel values.
+            row_b_weight (float)       : Interpolation weight of row 'b'.
+            brightness (float)         : Overall brightness, 0.0 to 1.0.
+            err (float ndarray or 0)   : Error residue from previous row.
+        Returns:
+            Tuple of uint8 ndarray with output values (BMP-native order)
+            and the error residue to be passed in for the next row.
+        """
+        # Pixel values are stored as bytes from 0-255.
+        # Gamma correction requires floats from 0.0 to 1.0.
+        # So there's a scaling operation involved, BUT, as
+        # configurable brightness is also a thing, we can
+        # work that into the same operation. Rather than
+        # dividing pixels by 255, multiply by
+        # brightness / 255. This reduces the two row
+        # interpolation weights from 0.0-1.0 to
+        # 0.0-brightness/255.
+        row_a_weight *= brightness / 255
+        row_b_weight *= brightness / 255
+
+        # 'want' is an ndarray of the idealized (as in,
+        # floating-point) pixel values resulting from the
+        # interpolation, with gamma correction applied and
+        # scaled back up to 8-bit range. Scaling to 254.999
+        # (not 255) lets us avoid a subsequent clip check.
+        want = ((((row_a_data * row_a_weight) +
+                  (row_b_data * row_b_weight)) **
+                 self.gamma) * 254.999)
+
+        # 'got' will be an ndarray of the values that get
+        # issued to the LED strip, formed through several
+        # operations. First, the 'want' values are quantized
+        # to uint8's -- so these will always be slightly
+        # dimmer (v. occasionally equal) to the 'want' vals.
+        got = ulab.numpy.array(want, dtype=ulab.numpy.uint8)
+        # Note: naive 'foo = foo + bar' syntax used in this
+        # next section is intentional. ndarrays don't seem
+        # to always play well with '+=' syntax.
+        # The difference between what we want and what we
+        # got will be an ndarray of values from 0.0 to <1.0.
+        # This is accumulated into the error ndarray to be
+        # applied to this and subsequent rows.
+        err = err + want - got
+        # Accumulated error vals will all now be 0.0 to <2.0.
+        # Quantizing err into a new uint8 ndarray, all values
+        # will be 0 or 1.
+        err_bits = ulab.numpy.array(err, dtype=ulab.numpy.uint8)
+        # Add the 1's back into 'got', increasing the
+        # brightness of certain pixels by 1. Because the max
+        # value in 'got' is 254 (not 255), no clipping need
+        # be performed, everything still fits in uint8.
+        got = got + err_bits
+        # Subtract those applied 1's from the error array,
+        # leaving residue in the range 0.0 to <1.0 which
+        # will be used on subsequent rows.
+        err = err - err_bits
+        return got, err
+
+
+    @staticmethod
+    def convert_row_lut(lut, row_a_wide, row_b_wide, row_b_weight, err):
+        """
+        Interpolate, gamma correct and dither one output row using integer
+        table lookups only. Same error diffusion as convert_row_float(),
+        done in 8.8 fixed point.
+        Arguments:
+            lut (uint16 ndarray)        : Table from gamma_table().
+            row_a_wide (uint16 ndarray) : BMP row 'a' pixel values.
+            row_b_wide (uint16 ndarray) : BMP row 'b' pixel values.
+            row_b_weight (float)        : Interpolation weight of row 'b'.
+            err (uint16 ndarray)        : Error residue from previous row.
+        Returns:
+            Tuple of uint8 ndarray with output values (BMP-native order)
+            and the error residue to be passed in for the next row.
+        """
+        # Weights are quantized to 1/LUT_BLEND_STEPS, index range is
+        # 0 to 255 * LUT_BLEND_STEPS -- exactly the table size.
+        blend = int(row_b_weight * LUT_BLEND_STEPS + 0.5)
+        index = (row_a_wide * (LUT_BLEND_STEPS - blend) +
+                 row_b_wide * blend)
+        # 'want' in 8.8 fixed point; adding the residue (<256) gives
+        # at most 65279 + 255, still fits in uint16.
+        want = ulab.numpy.take(lut, index) + err
+        # Integer part is what gets issued to the strip, fractional part
+        # is carried to the next row. As the table tops out at 254.999
+        # no clipping is needed.
+        got = want // 256
+        err = want - got * 256
+        return ulab.numpy.array(got, dtype=ulab.numpy.uint8), err
+
+
     # pylint: disable=too-many-arguments, too-many-locals
-    # pylint: disable=too-many-branches, too-many-statements
+    def convert_row_hdr(self, lut, row_a, row_b, row_a_weight, row_b_weight,
+                        brightness, err):
+        """
+        Interpolate, gamma correct and dither one output row for HDR mode.
+        Each pixel gets the smallest global brightness level that fits its
+        brightest channel, the channels are quantized in steps of that
+        level. Error diffusion runs on the combined value (channel * level,
+        0 to 255 * HDR_LEVELS), so the fine steps of dark pixels are kept.
+        Arguments:
+            lut (uint16 ndarray)   : Table from gamma_table(), or None to
+                                     use float gamma math.
+            row_a (ndarray)        : BMP row 'a' pixel values (uint16 if
+                                     lut is given, else uint8).
+            row_b (ndarray)        : BMP row 'b' pixel values (as row_a).
+            row_a_weight (float)   : Interpolation weight of row 'a'.
+            row_b_weight (float)   : Interpolation weight of row 'b'.
+            brightness (float)     : Overall brightness, 0.0 to 1.0 (only
+                                     used without lut, the table has it).
+            err (float ndarray)    : Error residue from previous row.
+        Returns:
+            Tuple of uint8 ndarray with channel values (BMP-native order),
+            uint8 ndarray with the global brightness level per pixel and
+            the error residue to be passed in for the next row.
+        """
+        if lut is not None:
+            blend = int(row_b_weight * LUT_BLEND_STEPS + 0.5)
+            index = (row_a * (LUT_BLEND_STEPS - blend) + row_b * blend)
+            want = ulab.numpy.take(lut, index) * (HDR_LEVELS / 256)
+        else:
+            want = (((((row_a * row_a_weight) + (row_b * row_b_weight)) *
+                      (brightness / 255)) ** self.gamma) *
+                    (254.999 * HDR_LEVELS))
+        total = want + err
+        # Smallest level that keeps the brightest channel within 255
+        level = ulab.numpy.maximum(ulab.numpy.maximum(total[0::3],
+                                                      total[1::3]),
+                                   total[2::3])
+        level = ulab.numpy.clip(ulab.numpy.ceil(level / 255), 1, HDR_LEVELS)
+        got = ulab.numpy.zeros(len(total), dtype=ulab.numpy.uint8)
+        for channel in range(3):
+            channel_total = total[channel::3]
+            # Accumulated error can push the top level slightly over 255
+            channel_got = ulab.numpy.array(
+                ulab.numpy.clip(channel_total / level, 0, 255),
+                dtype=ulab.numpy.uint8)
+            got[channel::3] = channel_got
+            # Residue is in combined units, carried to the next row
+            err[channel::3] = channel_total - channel_got * level
+        return got, ulab.numpy.array(level, dtype=ulab.numpy.uint8), err
+
+
+    # pylint: disable=too-many-arguments
     def process(self, input_filename, output_filename, rows,
                 brightness=1.0, loop=False, callback=None):
         """
+        Process a 24-bit uncompressed BMP file into a binary file of
+        DotStar-ready rows. Blocks until the whole image is converted;
+        see process_iter() for arguments and for a non-blocking variant.
+        Returns: actual number of rows in output file (may be less than
+                 number of rows requested, depending on storage space.
+        """
+        for _ in self.process_iter(input_filename, output_filename, rows,
+                                   brightness, loop, callback):
+            pass
+        return self.rows_total
+
+
+    # pylint: disable=too-many-arguments, too-many-locals
+    # pylint: disable=too-many-branches, too-many-statements
+    def process_iter(self, input_filename, output_filename, rows,
+                     brightness=1.0, loop=False, callback=None):
+        """
         Process a 24-bit uncompressed BMP file into a series of
         DotStar-ready rows of bytes (including header and footer) written
         to a binary file. The input image is stretched to a specified
@@ -207,18 +781,28 @@ class BMP2LED:
             callback (func)          : Callback function for displaying load
                                        progress, will be passed a float
                                        ranging from 0.0 (start) to 1.0 (end).
-        Returns: actual number of rows in output file (may be less than
-                 number of rows requested, depending on storage space.
+        This is a generator: it yields after every block of BUFFER_ROWS
+        rows written to the output file, so the caller can interleave the
+        conversion with other work (e.g. painting the rows done so far).
+        Progress is published in two attributes:
+            rows_done (int)  : Watermark; rows 0 to rows_done-1 are
+                               completely written and flushed to the
+                               output file and can be played.
+            rows_total (int) : None while converting. When the generator
+                               is exhausted: actual number of rows in output
+                               file (may be less than number of rows
+                               requested, depending on storage space), or
+                               None if the BMP could not be parsed.
         """
+        self.rows_done = 0
+        self.rows_total = None
 
         # Allocate a working buffer for DotStar data, sized for LED strip.
         # It's formed just like valid strip data (with header, per-pixel
         # start markers and footer), with colors all '0' to start...these
         # will be filled later.
-        dotstar_buffer = ulab.numpy.array([0] * 4 +
-                                    [255, 0, 0, 0] * self.pixel_count +
-                                    [255] * ((self.pixel_count + 15) // 16),
-                                    dtype=ulab.numpy.uint8)
+        dotstar_buffer = ulab.numpy.frombuffer(frame_off(self.pixel_count),
+                                               dtype=ulab.numpy.uint8)
         dotstar_row_size = len(dotstar_buffer)
 
         # Output rows are held in RAM and periodically written,
@@ -233,8 +817,7 @@ class BMP2LED:
             pass
 
         # Determine free space on drive
-        stats = os.statvfs('/')
-        bytes_free = stats[0] * stats[4]   # block size, free blocks
+        bytes_free = self.bytes_free()
         if not loop:                       # If not looping, leave space
             bytes_free -= dotstar_row_size # for 'off' LED data at end.
         # Clip the maximum number of output rows based on free space and
@@ -261,6 +844,16 @@ class BMP2LED:
                 row_b_data = ulab.numpy.zeros(row_bytes, dtype=ulab.numpy.uint8)
                 prev_row_a_index, prev_row_b_index = None, None
 
+                if self.use_lut:
+                    # Integer path: gamma and brightness are folded into
+                    # one table, so per row there is only an integer blend,
+                    # a table lookup and fixed point error diffusion.
+                    lut = self.gamma_table(brightness)
+                    row_a_wide = ulab.numpy.zeros(row_bytes,
+                                                  dtype=ulab.numpy.uint16)
+                    row_b_wide = ulab.numpy.zeros(row_bytes,
+                                                  dtype=ulab.numpy.uint16)
+
                 with open(output_filename, 'wb') as led_file:
                     # To avoid continually appending to output file (a slow
                     # operation), seek to where the end of the file would
@@ -268,8 +861,20 @@ class BMP2LED:
                     # the beginning. Significant improvement!
                     led_file.seek((dotstar_row_size * rows) - 1)
                     led_file.write(b'\0')
+                    # Commit size and cluster chain to the directory entry -
+                    # a reader opened while converting sees the whole file.
+                    led_file.flush()
                     led_file.seek(0)
-                    err = 0
+                    if self.hdr:
+                        # Error residue in combined channel * level units
+                        err = ulab.numpy.zeros(row_bytes,
+                                               dtype=ulab.numpy.float)
+                    elif self.use_lut:
+                        # Error residue in 1/256 steps (0 to 255)
+                        err = ulab.numpy.zeros(row_bytes,
+                                               dtype=ulab.numpy.uint16)
+                    else:
+                        err = 0
                     for row in range(rows): # For each output row...
                         # Scale position into pixel space...
                         if loop: # 0 to <image height
@@ -299,58 +904,38 @@ class BMP2LED:
                                 self.read_row(row_a_index, row_a_data)
                             # Read new 'b' data on any row change
                             self.read_row(row_b_index, row_b_data)
+                            if self.use_lut:
+                                # Widen to uint16 so the blend can't overflow
+                                row_a_wide = ulab.numpy.array(
+                                    row_a_data, dtype=ulab.numpy.uint16)
+                                row_b_wide = ulab.numpy.array(
+                                    row_b_data, dtype=ulab.numpy.uint16)
 
                         prev_row_a_index = row_a_index
                         prev_row_b_index = row_b_index
 
-                        # Pixel values are stored as bytes from 0-255.
-                        # Gamma correction requires floats from 0.0 to 1.0.
-                        # So there's a scaling operation involved, BUT, as
-                        # configurable brightness is also a thing, we can
-                        # work that into the same operation. Rather than
-                        # dividing pixels by 255, multiply by
-                        # brightness / 255. This reduces the two row
-                        # interpolation weights from 0.0-1.0 to
-                        # 0.0-brightness/255.
-                        row_a_weight *= brightness / 255
-                        row_b_weight *= brightness / 255
-
-                        # 'want' is an ndarray of the idealized (as in,
-                        # floating-point) pixel values resulting from the
-                        # interpolation, with gamma correction applied and
-                        # scaled back up to 8-bit range. Scaling to 254.999
-                        # (not 255) lets us avoid a subsequent clip check.
-                        want = ((((row_a_data * row_a_weight) +
-                                  (row_b_data * row_b_weight)) **
-                                 self.gamma) * 254.999)
-
-                        # 'got' will be an ndarray of the values that get
-                        # issued to the LED strip, formed through several
-                        # operations. First, the 'want' values are quantized
-                        # to uint8's -- so these will always be slightly
-                        # dimmer (v. occasionally equal) to the 'want' vals.
-                        got = ulab.numpy.array(want, dtype=ulab.numpy.uint8)
-                        # Note: naive 'foo = foo + bar' syntax used in this
-                        # next section is intentional. ndarrays don't seem
-                        # to always play well with '+=' syntax.
-                        # The difference between what we want and what we
-                        # got will be an ndarray of values from 0.0 to <1.0.
-                        # This is accumulated into the error ndarray to be
-                        # applied to this and subsequent rows.
-                        err = err + want - got
-                        # Accumulated error vals will all now be 0.0 to <2.0.
-                        # Quantizing err into a new uint8 ndarray, all values
-                        # will be 0 or 1.
-                        err_bits = ulab.numpy.array(err, dtype=ulab.numpy.uint8)
-                        # Add the 1's back into 'got', increasing the
-                        # brightness of certain pixels by 1. Because the max
-                        # value in 'got' is 254 (not 255), no clipping need
-                        # be performed, everything still fits in uint8.
-                        got = got + err_bits
-                        # Subtract those applied 1's from the error array,
-                        # leaving residue in the range 0.0 to <1.0 which
-                        # will be used on subsequent rows.
-                        err = err - err_bits
+                        if self.hdr:
+                            if self.use_lut:
+                                got, levels, err = self.convert_row_hdr(
+                                    lut, row_a_wide, row_b_wide,
+                                    row_a_weight, row_b_weight,
+                                    brightness, err)
+                            else:
+                                got, levels, err = self.convert_row_hdr(
+                                    None, row_a_data, row_b_data,
+                                    row_a_weight, row_b_weight,
+                                    brightness, err)
+                            # Start-of-pixel markers carry the level
+                            dotstar_buffer[4:4 + 4 * clipped_width:4] = (
+                                levels + 0xE0)
+                        elif self.use_lut:
+                            got, err = self.convert_row_lut(
+                                lut, row_a_wide, row_b_wide, row_b_weight, err)
+                        else:
+                            got, err = self.convert_row_float(
+                                row_a_data, row_a_weight,
+                                row_b_data, row_b_weight,
+                                brightness, err)
 
                         # Reorder data from BGR to DotStar color order,
                         # allowing for header and start-of-pixel markers
@@ -370,29 +955,29 @@ class BMP2LED:
                         output_position += dotstar_row_size
                         if output_position >= len(output_buffer):
                             led_file.write(output_buffer)
+                            led_file.flush()
                             if callback:
                                 callback(row / (rows - 1))
                             output_position = 0
+                            self.rows_done = row + 1
+                            yield self.rows_done
 
                     # Write any remaining buffered data
                     if output_position:
                         led_file.write(output_buffer[:output_position])
+                        led_file.flush()
                         if callback:
                             callback(1.0)
+                    self.rows_done = rows
 
                     # If not looping, add an 'all off' row of LED data
                     # at end to ensure last row timing is consistent.
                     if not loop:
                         rows += 1
-                        led_file.write(bytearray([0] * 4 +
-                                                 [255, 0, 0, 0] *
-                                                 self.pixel_count +
-                                                 [255] *
-                                                 ((self.pixel_count + 15) //
-                                                  16)))
+                        led_file.write(frame_off(self.pixel_count))
 
                 #print("Loaded OK!")
-                return rows
+                self.rows_total = rows
 
         except OSError as err:
             if err.args[0] == 28:
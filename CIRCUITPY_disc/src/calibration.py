@@ -0,0 +1,278 @@
+# SPDX-FileCopyrightText: 2024 Stefan Krüger s-light.eu
+# SPDX-License-Identifier: MIT
+# source https://github.com/s-light/cp_magic_painter/
+
+
+"""
+Hardware calibration profile.
+
+Measures the timing of the painting hardware once and keeps the results in
+a profile file (json) - so boot does not need to benchmark again.
+Profiles are stored per hardware key (board, strip and spi pins) -
+a new key (= changed hardware config) triggers a new calibration.
+
+measurements:
+- spi: seconds per full strip frame write at several baudrates
+- read: file read throughput (rows/s) at several batch sizes
+- write overhead: `dotstar.write` time for several pixel counts
+  → fixed overhead per write and time per pixel
+"""
+
+import json
+import time
+
+import board
+
+from control_frames import frame_off
+
+NS_PER_SECOND = 1_000_000_000
+
+
+def hw_key(config):
+    """key of the hardware config a profile is valid for."""
+    return "{}_{}_{}_{}_{}".format(
+        board.board_id,
+        config["hw"]["pixel_count"],
+        config["hw"]["pixel_color_order"],
+        config["hw"]["pixel_spi_pins"]["clock"],
+        config["hw"]["pixel_spi_pins"]["data"],
+    )
+
+
+class Calibration(object):
+    """Calibration."""
+
+    profile_version = 1
+
+    def __init__(
+        self,
+        *,
+        filename="/calibration.json",
+        key,
+        baudrates=(4_000_000, 8_000_000, 12_000_000, 16_000_000, 24_000_000),
+        batch_sizes=(1, 2, 4, 8, 16, 32),
+        repeats=50,
+    ):
+        self.filename = filename
+        self.key = key
+        self.baudrates = baudrates
+        self.batch_sizes = batch_sizes
+        self.repeats = repeats
+        # profiles of all known hardware configs
+        self.profiles = {}
+        # profile of the current hardware config
+        self.profile = None
+
+    ##########################################
+    # file
+
+    def load(self):
+        """
+        Load profile file.
+
+        Returns True if there is a profile for the current hardware config.
+        """
+        try:
+            with open(self.filename, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as error:
+            print("Calibration: no usable profile file ({}).".format(error))
+            return False
+        if data.get("version") != self.profile_version:
+            print("Calibration: profile version mismatch.")
+            return False
+        self.profiles = data.get("profiles", {})
+        self.profile = self.profiles.get(self.key)
+        return self.profile is not None
+
+    def save(self):
+        """Save all profiles. Returns False if the filesystem is read-only."""
+        self.profiles[self.key] = self.profile
+        data = {
+            "version": self.profile_version,
+            "profiles": self.profiles,
+        }
+        try:
+            with open(self.filename, "w") as file:
+                json.dump(data, file)
+        except OSError as error:
+            print("Calibration: could not save profile ({}).".format(error))
+            return False
+        return True
+
+    ##########################################
+    # measurements
+
+    def measure_spi(self, spi, pixel_count):
+        """
+        Seconds per full strip frame write at every baudrate.
+
+        the spi baudrate is left at the last tested value -
+        the caller needs to configure the wanted one afterwards.
+        """
+        frame = frame_off(pixel_count)
+        result = {}
+        for baudrate in self.baudrates:
+            spi.configure(baudrate=baudrate)
+            # the hardware may not hit every rate exactly
+            baudrate = getattr(spi, "frequency", baudrate)
+            start = time.monotonic_ns()
+            for _ in range(self.repeats):
+                spi.write(frame)
+            duration = time.monotonic_ns() - start
+            result[str(baudrate)] = duration / self.repeats / NS_PER_SECOND
+        return result
+
+    def measure_read(self, filename, pixel_count):
+        """
+        File read throughput in rows/s at every batch size.
+        (batch = rows read with one readinto)
+        """
+        frame = frame_off(pixel_count)
+        row_size = len(frame)
+        batch_max = max(self.batch_sizes)
+        with open(filename, "wb") as file:
+            for _ in range(batch_max):
+                file.write(frame)
+        buffer = bytearray(row_size * batch_max)
+        buffer_view = memoryview(buffer)
+        result = {}
+        with open(filename, "rb") as file:
+            for batch_rows in self.batch_sizes:
+                batch_view = buffer_view[: row_size * batch_rows]
+                rows = 0
+                start = time.monotonic_ns()
+                while rows < self.repeats:
+                    file.seek(0)
+                    file.readinto(batch_view)
+                    rows += batch_rows
+                duration = time.monotonic_ns() - start
+                result[str(batch_rows)] = rows * NS_PER_SECOND / duration
+        return result
+
+    def measure_write_overhead(self, spi, pixel_count):
+        """
+        `write` time for several pixel counts at the current baudrate.
+
+        Returns:
+            dict with times per pixel count and the linear fit
+            `overhead` (seconds per write) + `per_pixel` (seconds per pixel).
+        """
+        pixel_counts = sorted(set((1, pixel_count // 4, pixel_count // 2, pixel_count)))
+        times = {}
+        for count in pixel_counts:
+            frame = frame_off(count)
+            start = time.monotonic_ns()
+            for _ in range(self.repeats):
+                spi.write(frame)
+            times[count] = (time.monotonic_ns() - start) / self.repeats / NS_PER_SECOND
+        # least squares line through the points
+        n = len(pixel_counts)
+        mean_x = sum(pixel_counts) / n
+        mean_y = sum(times.values()) / n
+        variance = sum((x - mean_x) ** 2 for x in pixel_counts)
+        per_pixel = 0.0
+        if variance:
+            per_pixel = (
+                sum((x - mean_x) * (times[x] - mean_y) for x in pixel_counts)
+                / variance
+            )
+        return {
+            "times": {str(count): value for count, value in times.items()},
+            "overhead": max(0.0, mean_y - per_pixel * mean_x),
+            "per_pixel": per_pixel,
+        }
+
+    def calibrate(self, spi, *, pixel_count, baudrate, filename):
+        """
+        Run all measurements and build a new profile.
+
+        Arguments:
+            spi (busio.SPI) : locked spi bus of the strip.
+            pixel_count (int) : strip length.
+            baudrate (int) : baudrate used for painting.
+            filename (string) : scratch file for the read measurement.
+                (is kept - so read-only boots can still use it)
+        """
+        print("Calibration: measuring..")
+        start = time.monotonic()
+        # keep the result of spi_tune (see POVPainter)
+        baudrate_tuned = bool(
+            self.profile
+            and self.profile.get("baudrate_tuned")
+            and self.profile.get("baudrate") == baudrate
+        )
+        spi_times = self.measure_spi(spi, pixel_count)
+        spi.configure(baudrate=baudrate)
+        write_overhead = self.measure_write_overhead(spi, pixel_count)
+        read = self.measure_read(filename, pixel_count)
+        batch_rows = max(read, key=lambda batch: read[batch])
+        self.profile = {
+            "spi": spi_times,
+            "read": read,
+            "write_overhead": write_overhead,
+            "batch_rows": int(batch_rows),
+            "baudrate": baudrate,
+            "baudrate_tuned": baudrate_tuned,
+        }
+        print("Calibration: done in {:.2f}s".format(time.monotonic() - start))
+        return self.profile
+
+    ##########################################
+    # results
+
+    def spi_time(self, baudrate):
+        """
+        seconds per full strip frame - interpolated from the measurements.
+
+        outside the measured rates the time scales with 1 / baudrate
+        (e.g. rates found by spi_tune above the calibrated list).
+        """
+        spi = self.profile["spi"]
+        rates = sorted(int(rate) for rate in spi)
+        if baudrate <= rates[0]:
+            return spi[str(rates[0])] * rates[0] / baudrate
+        for low, high in zip(rates, rates[1:]):
+            if low <= baudrate <= high:
+                weight = (baudrate - low) / (high - low)
+                return spi[str(low)] * (1 - weight) + spi[str(high)] * weight
+        return spi[str(rates[-1])] * rates[-1] / baudrate
+
+    def rows_per_second(self, *, baudrate=None, batch_rows=None, row_delay=0.001):
+        """
+        Expected paint_v2 throughput: read + write + delay per row.
+
+        (row_delay: the small delay the old boot benchmark included)
+        """
+        if baudrate is None:
+            baudrate = self.profile["baudrate"]
+        if batch_rows is None:
+            batch_rows = self.profile["batch_rows"]
+        read = self.profile["read"]
+        read_rows_per_second = read.get(str(batch_rows))
+        if read_rows_per_second is None:
+            # largest measured batch not bigger than batch_rows
+            sizes = sorted(int(size) for size in read)
+            measured = sizes[0]
+            for size in sizes:
+                if size <= batch_rows:
+                    measured = size
+            read_rows_per_second = read[str(measured)]
+        row_time = 1 / read_rows_per_second + self.spi_time(baudrate) + row_delay
+        return int(1 / row_time)
+
+    def __str__(self):
+        if not self.profile:
+            return "Calibration: no profile"
+        return (
+            "Calibration '{}': "
+            "batch {} rows, {} rows/s, "
+            "write overhead {:.1f}us + {:.3f}us/pixel"
+            "".format(
+                self.key,
+                self.profile["batch_rows"],
+                self.rows_per_second(),
+                self.profile["write_overhead"]["overhead"] * 1_000_000,
+                self.profile["write_overhead"]["per_pixel"] * 1_000_000,
+            )
+        )
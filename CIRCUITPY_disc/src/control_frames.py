@@ -0,0 +1,97 @@
+# SPDX-FileCopyrightText: 2024 Stefan Krüger s-light.eu
+# SPDX-License-Identifier: MIT
+# source https://github.com/s-light/cp_magic_painter/
+
+
+"""
+Prebuilt strip frames for status output.
+
+all off, pixel ranges and the load progress bar are built once per strip
+and then only changed in place - every call is one write of a ready buffer.
+(layout as the original `clear_strip`: start frame, pixels with
+header 0xFF and end frame of 0xFF bytes)
+"""
+
+import ulab
+
+
+def frame_off(pixel_count):
+    """all off frame."""
+    return bytearray(
+        [0] * 4 + [255, 0, 0, 0] * pixel_count + [255] * ((pixel_count + 15) // 16)
+    )
+
+
+class ControlFrames(object):
+    """Control frames of one strip."""
+
+    def __init__(self, *, pixel_count, color_order, init_pixel_count=36 * 5):
+        """
+        Arguments:
+            pixel_count (int) : strip length.
+            color_order (string) : DotStar color order (e.g. 'bgr').
+            init_pixel_count (int) : pixels cleared by `init`
+                (more than the strip - also clears longer strips).
+        """
+        self.pixel_count = pixel_count
+        self.color_indices = (
+            color_order.find("r"),
+            color_order.find("g"),
+            color_order.find("b"),
+        )
+        self.off = frame_off(pixel_count)
+        # one frame - so spi_init does not need a write per pixel
+        self.init = bytearray([0] * 4 + [255, 0, 0, 0] * init_pixel_count + [255] * 4)
+
+        self.range_frame = bytearray(self.off)
+        self.range_channels = self.channel_views(self.range_frame)
+        self.range_state = None
+
+        self.progress_frame = bytearray(self.off)
+        self.progress_channels = self.channel_views(self.progress_frame)
+        self.progress_color = None
+        # pixels lit in progress_frame
+        self.progress_count = 0
+
+    def channel_views(self, frame):
+        """(red, green, blue) ulab views - one entry per pixel."""
+        array = ulab.numpy.frombuffer(frame, dtype=ulab.numpy.uint8)
+        end = 4 + 4 * self.pixel_count
+        return tuple(array[5 + index : end : 4] for index in self.color_indices)
+
+    def range(self, *, begin, end, r, g, b):
+        """
+        Frame with pixels begin..end (inclusive) set to color - others off.
+        (the frame is changed in place - write it before the next call)
+        """
+        state = (begin, end, r, g, b)
+        if state != self.range_state:
+            self.range_state = state
+            for channel, value in zip(self.range_channels, (r, g, b)):
+                channel[:] = 0
+                channel[begin : end + 1] = value
+        return self.range_frame
+
+    def progress(self, amount, *, r=0, g=1, b=0):
+        """
+        Progress bar frame - only the changed pixels are updated.
+
+        Arguments:
+            amount (float) : 0.0 to 1.0
+        """
+        color = (r, g, b)
+        if color != self.progress_color:
+            self.progress_color = color
+            self.progress_count = 0
+            for channel in self.progress_channels:
+                channel[:] = 0
+        # (as the original bar - pixel 0 is always on)
+        count = min(int(amount * self.pixel_count + 0.5) + 1, self.pixel_count)
+        if count > self.progress_count:
+            for channel, value in zip(self.progress_channels, color):
+                channel[self.progress_count : count] = value
+        elif count < self.progress_count:
+            for channel in self.progress_channels:
+                channel[count : self.progress_count] = 0
+        self.progress_count = count
+        return self.progress_frame
@@ -0,0 +1,267 @@
+# SPDX-FileCopyrightText: 2024 Stefan Krüger s-light.eu
+# SPDX-License-Identifier: MIT
+# source https://github.com/s-light/cp_magic_painter/
+
+
+"""
+Persistent cache of converted LED data files.
+
+Every converted image is stored as its own DotStar-ready file in the
+cache folder. An index file (json) maps the conversion parameters to the
+file so that returning to an already converted image only costs a
+file open.
+
+Entries are keyed by
+- image content (crc32 - only recalculated if size or mtime changed)
+- brightness, gamma, row count, color order, loop and hdr flag
+
+If the drive runs out of space the least recently used entries are removed.
+
+Entries marked as `prebuilt` (created on a computer with
+tools/bmp2led_compile.py) are also used if only the row count differs.
+"""
+
+import os
+import json
+import binascii
+
+
+def file_crc(filename):
+    """crc32 of file content."""
+    crc = 0
+    buffer = bytearray(512)
+    buffer_view = memoryview(buffer)
+    with open(filename, "rb") as file:
+        while True:
+            count = file.readinto(buffer)
+            if not count:
+                break
+            crc = binascii.crc32(buffer_view[:count], crc)
+    return crc & 0xFFFFFFFF
+
+
+class LEDCache(object):
+    """LEDCache."""
+
+    index_version = 2
+
+    def __init__(self, *, path="/led_cache", writeable=True):
+        self.path = path
+        self.index_filename = self.path + "/index.json"
+        self.writeable = writeable
+
+        self.entries = {}
+        self.images = {}
+        # counter for least recently used handling.
+        # (time.monotonic starts at 0 on every boot so we can not use it..)
+        self.use_counter = 0
+        self.index_dirty = False
+
+        if self.writeable:
+            try:
+                os.mkdir(self.path)
+            except OSError:
+                # already exists
+                pass
+        self.load_index()
+
+    ##########################################
+    # index
+
+    def load_index(self):
+        try:
+            with open(self.index_filename, "r") as file:
+                index = json.load(file)
+        except (OSError, ValueError) as error:
+            print("LEDCache: no usable index ({}). start empty.".format(error))
+            return
+        if index.get("version") != self.index_version:
+            print("LEDCache: index version mismatch. start empty.")
+            # the old keys never match again - free their files.
+            if self.writeable:
+                for entry in index.get("entries", {}).values():
+                    try:
+                        os.remove(entry["file"])
+                    except (OSError, KeyError, TypeError):
+                        pass
+            return
+        self.entries = index.get("entries", {})
+        self.images = index.get("images", {})
+        for entry in self.entries.values():
+            self.use_counter = max(self.use_counter, entry["used"])
+
+    def save_index(self):
+        if not self.writeable:
+            return
+        index = {
+            "version": self.index_version,
+            "entries": self.entries,
+            "images": self.images,
+        }
+        # write to temporary file first - so a power loss does not leave
+        # us with a broken index.
+        temp_filename = self.index_filename + ".tmp"
+        with open(temp_filename, "w") as file:
+            json.dump(index, file)
+        try:
+            os.remove(self.index_filename)
+        except OSError:
+            pass
+        os.rename(temp_filename, self.index_filename)
+        self.index_dirty = False
+
+    ##########################################
+    # keys
+
+    def image_crc(self, image_filename):
+        """
+        Get crc32 of image file content.
+        Only read the file if size or mtime changed since last time.
+        """
+        stat = os.stat(image_filename)
+        size = stat[6]
+        mtime = stat[8]
+        info = self.images.get(image_filename)
+        if info and info[0] == size and info[1] == mtime:
+            return info[2]
+        crc = file_crc(image_filename)
+        self.images[image_filename] = [size, mtime, crc]
+        self.index_dirty = True
+        return crc
+
+    @staticmethod
+    def make_key(crc, *, brightness, gamma, rows, color_order, loop, hdr=False):
+        """
+        Build cache key from image crc and conversion parameters.
+
+        the row count is the last part (`_r{rows}`) -
+        everything before is the base key used to match prebuilt entries.
+        """
+        return "{:08x}_{:.4f}_{:.3f}_{}_{:d}{}_r{}".format(
+            crc,
+            brightness,
+            gamma,
+            color_order,
+            int(loop),
+            "_hdr" if hdr else "",
+            rows,
+        )
+
+    @staticmethod
+    def base_key(key):
+        return key.rsplit("_r", 1)[0]
+
+    @staticmethod
+    def file_basename(key):
+        return "{:08x}.dat".format(binascii.crc32(key.encode()) & 0xFFFFFFFF)
+
+    def key(
+        self, image_filename, *, brightness, gamma, rows, color_order, loop, hdr=False
+    ):
+        """Build cache key for image and conversion parameters."""
+        return self.make_key(
+            self.image_crc(image_filename),
+            brightness=brightness,
+            gamma=gamma,
+            rows=rows,
+            color_order=color_order,
+            loop=loop,
+            hdr=hdr,
+        )
+
+    def filename_for(self, key):
+        """Filename (inkl. path) of the LED data file for key."""
+        return self.path + "/" + self.file_basename(key)
+
+    ##########################################
+    # main api
+
+    def lookup(self, key):
+        """
+        Get cached LED data file.
+
+        Returns:
+            tuple (filename, num_rows) or None if key is not cached.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            base = self.base_key(key)
+            for key_prebuilt, entry_prebuilt in self.entries.items():
+                if entry_prebuilt.get("prebuilt") and entry_prebuilt["base"] == base:
+                    key = key_prebuilt
+                    entry = entry_prebuilt
+                    break
+        if entry is None:
+            return None
+        try:
+            os.stat(entry["file"])
+        except OSError:
+            # file was deleted from outside..
+            del self.entries[key]
+            self.index_dirty = True
+            return None
+        self.use_counter += 1
+        entry["used"] = self.use_counter
+        # no index write on every hit - this would wear the flash.
+        # the lru order is saved with the next add / evict.
+        self.index_dirty = True
+        return entry["file"], entry["rows"]
+
+    def add(self, key, filename, num_rows, *, prebuilt=False, save=True):
+        """Register a freshly converted LED data file."""
+        self.use_counter += 1
+        self.entries[key] = {
+            "file": filename,
+            "rows": num_rows,
+            "used": self.use_counter,
+            "base": self.base_key(key),
+            "prebuilt": prebuilt,
+        }
+        if save:
+            self.save_index()
+
+    def remove(self, key):
+        entry = self.entries.pop(key)
+        try:
+            os.remove(entry["file"])
+        except OSError:
+            pass
+        self.index_dirty = True
+
+    def key_for_file(self, filename):
+        """Key of the entry stored in `filename` - None if not cached."""
+        for key, entry in self.entries.items():
+            if entry["file"] == filename:
+                return key
+        return None
+
+    def make_room(self, bytes_needed, bytes_free_fn, *, exclude=None):
+        """
+        Evict least recently used entries until `bytes_needed` are free.
+
+        Arguments:
+            bytes_needed (int) : space needed for the next conversion.
+            bytes_free_fn (func) : returns current free space in bytes.
+                (normally BMP2LED.bytes_free - the same check process() uses)
+            exclude (string) : key that is never evicted
+                (the entry that is painted while the next image is converted).
+        Returns:
+            True if enough space is available.
+        """
+        evicted = False
+        while bytes_free_fn() < bytes_needed:
+            candidates = [key for key in self.entries if key != exclude]
+            if not candidates:
+                break
+            key_lru = min(candidates, key=lambda key: self.entries[key]["used"])
+            print("LEDCache: evict '{}'".format(key_lru))
+            self.remove(key_lru)
+            evicted = True
+        if evicted:
+            self.save_index()
+        return bytes_free_fn() >= bytes_needed
+
+    def clear(self):
+        for key in list(self.entries):
+            self.remove(key)
+        self.save_index()
@@ -124,6 +124,8 @@ class MagicPainter(ConfigBaseClass):
                 config=self.config,
                 print_fn=self.print,
                 accel_sensor=self.userinput.accel_sensor,
+                # button events abort a running stroke
+                input_events=self.userinput.button.events,
             ),
         ]
         self.mode = self.modes[0]
@@ -85,6 +85,14 @@ class ModeBaseClass(ConfigBaseClass):
     def handle_gesture(self, event):
         pass
 
+    def handle_command(self, input_string):
+        """
+        Handle serial command not known to UserInput.
+
+        Returns True if the command was handled.
+        """
+        return False
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # main
 
@@ -0,0 +1,121 @@
+# SPDX-FileCopyrightText: 2024 Stefan Krüger s-light.eu
+# SPDX-License-Identifier: MIT
+# source https://github.com/s-light/cp_magic_painter/
+
+
+"""
+Column timing statistics of the paint loops.
+
+the paint loop only stores the emission time of every column
+(us since stroke start) into a preallocated integer ring.
+after the stroke `stroke_done` compares them with the column schedule
+(or - without schedule - with the fastest column interval)
+and keeps a summary of the stroke and a histogram over all strokes.
+GC pauses and slow SPI writes show up as high percentiles / max.
+"""
+
+import array
+
+# histogram bucket upper edges in us - the last bucket is everything above.
+BUCKET_EDGES_US = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def percentile(values_sorted, fraction):
+    index = min(len(values_sorted) - 1, int(fraction * len(values_sorted)))
+    return values_sorted[index]
+
+
+class PaintStats(object):
+    """Jitter of the column emission times."""
+
+    def __init__(self, size=512):
+        """
+        Arguments:
+            size (int) : columns kept per stroke
+                (longer strokes: only the last `size` columns are summarized).
+        """
+        self.size = size
+        self.ring = array.array("l", [0] * size)
+        self.histogram = array.array("L", [0] * (len(BUCKET_EDGES_US) + 1))
+        self.strokes = 0
+        # summary of the last stroke
+        self.last = None
+
+    def reset(self):
+        for index in range(len(self.histogram)):
+            self.histogram[index] = 0
+        self.strokes = 0
+        self.last = None
+
+    def stroke_done(self, count, schedule=None):
+        """
+        Summarize the `count` columns of the stroke. (allocates - call after it)
+
+        Arguments:
+            count (int) : columns painted.
+            schedule (list) : column deadlines in ns since stroke start
+                (see stroke_timing) - None if painted as fast as possible.
+        """
+        if count < 2:
+            return
+        size = self.size
+        first = max(0, count - size)
+        emissions = [self.ring[index % size] for index in range(first, count)]
+        if schedule:
+            # late against the deadline
+            jitter = [
+                emission - schedule[index] // 1000
+                for index, emission in zip(range(first, count), emissions)
+            ]
+        else:
+            # longer than the fastest column
+            intervals = [b - a for a, b in zip(emissions, emissions[1:])]
+            fastest = min(intervals)
+            jitter = [interval - fastest for interval in intervals]
+        for value in jitter:
+            value = abs(value)
+            bucket = 0
+            for edge in BUCKET_EDGES_US:
+                if value <= edge:
+                    break
+                bucket += 1
+            self.histogram[bucket] += 1
+        jitter.sort()
+        self.strokes += 1
+        self.last = {
+            "columns": count,
+            "min": jitter[0],
+            "p50": percentile(jitter, 0.5),
+            "p95": percentile(jitter, 0.95),
+            "p99": percentile(jitter, 0.99),
+            "max": jitter[-1],
+        }
+
+    def statusline(self):
+        """short summary of the last stroke (in ms)."""
+        if not self.last:
+            return "jitter: -"
+        return "jitter p95: {:>5.2f}ms max: {:>5.2f}ms".format(
+            self.last["p95"] / 1000, self.last["max"] / 1000
+        )
+
+    def __str__(self):
+        lines = ["PaintStats: {} strokes".format(self.strokes)]
+        if self.last:
+            lines.append(
+                "last stroke: {columns} columns - jitter us "
+                "min {min} p50 {p50} p95 {p95} p99 {p99} max {max}"
+                "".format(**self.last)
+            )
+        total = sum(self.histogram) or 1
+        low = 0
+        for index, value in enumerate(self.histogram):
+            if index < len(BUCKET_EDGES_US):
+                label = "{:>5}..{:<5}us".format(low, BUCKET_EDGES_US[index])
+                low = BUCKET_EDGES_US[index]
+            else:
+                label = "{:>5}..     us".format(low)
+            lines.append(
+                "  {} {:>7} {}".format(label, value, "#" * (40 * value // total))
+            )
+        return "\n".join(lines)
@@ -0,0 +1,136 @@
+# SPDX-FileCopyrightText: 2024 Stefan Krüger s-light.eu
+# SPDX-License-Identifier: MIT
+# source https://github.com/s-light/cp_magic_painter/
+
+
+"""
+Procedural POV patterns - images without image files.
+
+A pattern renders one column at a time into preallocated color views
+(ulab uint8 arrays with one entry per pixel - views into the strip frame).
+`setup()` is called once with the image size and prepares everything
+that does not change per column - `render()` then only does cheap
+ulab assignments. (see GeneratorFrameStore in povpainter.py)
+
+add own patterns to `PATTERNS` - anything with `setup` and `render` works.
+"""
+
+import ulab
+
+
+class Pattern(object):
+    """Pattern base."""
+
+    # render result depends on the stroke direction
+    directional = False
+
+    def setup(self, *, pixel_count, frame_count, value=255):
+        """
+        Prepare for image size.
+
+        Arguments:
+            pixel_count (int) : pixels per column.
+            frame_count (int) : columns of the image.
+            value (int) : full intensity (0..255).
+        """
+        self.pixel_count = pixel_count
+        self.frame_count = frame_count
+        self.value = value
+
+    def render(self, column, red, green, blue, backwards):
+        """
+        Render one column. (patterns override this - the base is dark)
+
+        Arguments:
+            column (int) : column to render (image order).
+            red, green, blue (ulab uint8 view) : pixel values to fill.
+            backwards (bool) : stroke direction.
+        """
+        red[:] = 0
+        green[:] = 0
+        blue[:] = 0
+
+
+class Gradient(Pattern):
+    """red → blue along the strip, green rising over the columns."""
+
+    def setup(self, *, pixel_count, frame_count, value=255):
+        super(Gradient, self).setup(
+            pixel_count=pixel_count, frame_count=frame_count, value=value
+        )
+        ramp = ulab.numpy.arange(pixel_count, dtype=ulab.numpy.float) * (
+            value / max(1, pixel_count - 1)
+        )
+        self.up = ulab.numpy.array(ramp, dtype=ulab.numpy.uint8)
+        self.down = ulab.numpy.array(value - ramp, dtype=ulab.numpy.uint8)
+
+    def render(self, column, red, green, blue, backwards):
+        red[:] = self.down
+        green[:] = column * self.value // max(1, self.frame_count - 1)
+        blue[:] = self.up
+
+
+class Diagonal(Pattern):
+    """white line from the first to the last pixel over the image."""
+
+    def render(self, column, red, green, blue, backwards):
+        red[:] = 0
+        green[:] = 0
+        blue[:] = 0
+        pixel = column * (self.pixel_count - 1) // max(1, self.frame_count - 1)
+        red[pixel] = self.value
+        green[pixel] = self.value
+        blue[pixel] = self.value
+
+
+class Checkerboard(Pattern):
+    """white / black squares."""
+
+    def __init__(self, size=8):
+        self.size = size
+
+    def setup(self, *, pixel_count, frame_count, value=255):
+        super(Checkerboard, self).setup(
+            pixel_count=pixel_count, frame_count=frame_count, value=value
+        )
+        self.phases = []
+        for phase in range(2):
+            values = ulab.numpy.zeros(pixel_count, dtype=ulab.numpy.uint8)
+            for start in range(phase * self.size, pixel_count, 2 * self.size):
+                values[start : start + self.size] = value
+            self.phases.append(values)
+
+    def render(self, column, red, green, blue, backwards):
+        values = self.phases[(column // self.size) % 2]
+        red[:] = values
+        green[:] = values
+        blue[:] = values
+
+
+class DirectionMarker(Pattern):
+    """
+    dim base with a white diagonal and the last pixel
+    red when painted forwards / green when painted backwards.
+    """
+
+    directional = True
+
+    def render(self, column, red, green, blue, backwards):
+        dim = max(1, self.value // 64)
+        red[:] = dim
+        green[:] = 0
+        blue[:] = 0
+        pixel = column * (self.pixel_count - 1) // max(1, self.frame_count - 1)
+        red[pixel] = self.value
+        green[pixel] = self.value
+        blue[pixel] = self.value
+        red[-1] = 0 if backwards else self.value
+        green[-1] = self.value if backwards else 0
+
+
+PATTERNS = {
+    "gradient": Gradient,
+    "diagonal": Diagonal,
+    "checkerboard": Checkerboard,
+    "direction": DirectionMarker,
+}
@@ -0,0 +1,172 @@
+# SPDX-FileCopyrightText: 2024 Stefan Krüger s-light.eu
+# SPDX-License-Identifier: MIT
+# source https://github.com/s-light/cp_magic_painter/
+
+
+"""
+POV text - strings rasterized from a BDF font into strip frames.
+
+every glyph is rendered once into complete strip frames
+(one per glyph column - see BMP2LED.column_frame_size) and kept in the
+`GlyphCache`. a text is then only a list of memoryviews into the cached
+glyphs (see TextFrameStore in povpainter.py) -
+a changed text (e.g. a ticking clock) only renders the glyphs
+that are not cached yet.
+the cache is valid for one color value - on brightness change
+(baked brightness) it is cleared.
+
+font rows go along the strip - the bottom of the glyph to the first pixel
+(same as the bottom BMP row in BMP2LED).
+"""
+
+import time
+
+from bmp2led import BMP2LED
+
+
+def clock_text(format="{:02d}:{:02d}"):
+    """current RTC time as text. (`format` gets hour, minute, second)"""
+    current = time.localtime()
+    return format.format(current.tm_hour, current.tm_min, current.tm_sec)
+
+
+class GlyphCache(object):
+    """Glyph columns of one font as strip frames."""
+
+    def __init__(
+        self,
+        font,
+        *,
+        pixel_count,
+        color_order,
+        color=(255, 255, 255),
+        value=255,
+        pixel_header=0xFF,
+        scale=None,
+    ):
+        """
+        Arguments:
+            font : font loaded by adafruit_bitmap_font.
+            pixel_count (int) : strip length.
+            color_order (string) : DotStar color order (e.g. 'bgr').
+            color (tuple) : text color (r, g, b) 0..255.
+            value (int) : full intensity (0..255) - color is scaled by it.
+            pixel_header (int) : per pixel start byte.
+            scale (int) : pixel rows per font row
+                (None: as big as fits the strip).
+        """
+        self.font = font
+        self.pixel_count = pixel_count
+        self.frame_size = BMP2LED.column_frame_size(pixel_count)
+        self.color_indices = (
+            color_order.find("r"),
+            color_order.find("g"),
+            color_order.find("b"),
+        )
+        self.color = color
+        self.value = value
+        self.pixel_header = pixel_header
+        self.line_height, self.baseline = self.font_metrics(font)
+        if not scale:
+            scale = max(1, pixel_count // self.line_height)
+        self.scale = scale
+        # center the line on the strip
+        self.margin = max(0, (pixel_count - self.line_height * scale) // 2)
+        # one shared dark column - for unknown characters and spacing
+        self.blank = self.buffer_new(1)
+        self.blank_view = memoryview(self.blank)
+        # char → (buffer, [column memoryviews])
+        self.glyphs = {}
+
+    @staticmethod
+    def font_metrics(font):
+        """(line height, baseline row from the top) in font pixels."""
+        _, height, _, y_offset = font.get_bounding_box()
+        return height, height + y_offset
+
+    def buffer_new(self, columns):
+        buffer = bytearray(columns * self.frame_size)
+        BMP2LED.set_pixel_headers(buffer, self.pixel_count, self.pixel_header)
+        return buffer
+
+    @property
+    def ram_size(self):
+        return len(self.blank) + sum(len(buffer) for buffer, _ in self.glyphs.values())
+
+    def set_value(self, value):
+        """new full intensity - cached glyphs are rendered again on use."""
+        if value != self.value:
+            self.value = value
+            self.glyphs = {}
+
+    def set_pixel_header(self, pixel_header):
+        if pixel_header != self.pixel_header:
+            self.pixel_header = pixel_header
+            BMP2LED.set_pixel_headers(self.blank, self.pixel_count, pixel_header)
+            for buffer, _ in self.glyphs.values():
+                BMP2LED.set_pixel_headers(buffer, self.pixel_count, pixel_header)
+
+    def render(self, char):
+        """Rasterize one glyph into strip frames (one per advance column)."""
+        self.font.load_glyphs(char)
+        glyph = self.font.get_glyph(ord(char))
+        if glyph is None:
+            print("GlyphCache: no glyph for '{}'".format(char))
+            return None, [self.blank_view]
+        columns = max(1, glyph.shift_x)
+        buffer = self.buffer_new(columns)
+        color = [channel * self.value // 255 for channel in self.color]
+        scale = self.scale
+        # first font row of the bitmap (from the top of the line)
+        top = self.baseline - glyph.dy - glyph.height
+        bitmap = glyph.bitmap
+        for column in range(columns):
+            x = column - glyph.dx
+            if not 0 <= x < glyph.width:
+                continue
+            column_start = column * self.frame_size + 4
+            for y in range(glyph.height):
+                if not bitmap[x, y]:
+                    continue
+                row = (top + y) * scale + self.margin
+                for sub_row in range(scale):
+                    pixel = self.pixel_count - 1 - (row + sub_row)
+                    if not 0 <= pixel < self.pixel_count:
+                        continue
+                    offset = column_start + pixel * 4 + 1
+                    for index, channel in zip(self.color_indices, color):
+                        buffer[offset + index] = channel
+        view = memoryview(buffer)
+        return buffer, [
+            view[column * self.frame_size : (column + 1) * self.frame_size]
+            for column in range(columns)
+        ]
+
+    def glyph(self, char):
+        """list of column frames of `char` - rendered if not cached."""
+        try:
+            return self.glyphs[char][1]
+        except KeyError:
+            pass
+        buffer, columns = self.render(char)
+        if buffer is not None:
+            self.glyphs[char] = (buffer, columns)
+        return columns
+
+    def columns(self, text, *, column_repeat=1, padding=0):
+        """
+        Column frames for `text`.
+
+        Arguments:
+            text (string) : text to render.
+            column_repeat (int) : paint every column n times (aspect ratio).
+            padding (int) : dark columns before and after the text.
+        """
+        frames = [self.blank_view] * padding
+        for char in text:
+            for column in self.glyph(char):
+                for _ in range(column_repeat):
+                    frames.append(column)
+        frames.extend([self.blank_view] * padding)
+        return frames
+
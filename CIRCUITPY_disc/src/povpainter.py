@@ -38,6 +38,7 @@ HW: some high speed processor...
 
 
 import gc
+import os
 import time
 
 import board
@@ -47,7 +48,10 @@ import displayio
 
 import json
 
+import ulab
+
 import adafruit_imageload
+from adafruit_bitmap_font import bitmap_font
 import ansi_escape_code as terminal
 from ansi_escape_code.progressbar import ProgressBar
 
@@ -58,6 +62,14 @@ from configdict import extend_deep
 import helper
 
 from bmp2led import BMP2LED, BMPError
+from led_cache import LEDCache
+from control_frames import ControlFrames, frame_off
+from patterns import PATTERNS
+from spi_capture import SPICapture
+from paint_stats import PaintStats
+import pov_text
+from calibration import Calibration, hw_key
+import stroke_timing
 
 from gesture_detector import (
     UNKNOWN,
@@ -75,6 +87,553 @@ from gesture_detector import (
     SHAKE_Z,
 )
 
+##########################################
+# frame stores
+
+
+class FrameStore(object):
+    """
+    One image as a sequence of complete SPI frames.
+
+    every frame is start frame + pixels + end frame
+    (see BMP2LED.column_frame_size) and is served as memoryview -
+    ready for `dotstar.write()`.
+    call `prepare()` before a stroke - `frame()` is then called in paint order
+    and does not allocate.
+    """
+
+    def __init__(self, *, frame_count, pixel_count, pixel_header=0xFF, frame_size=None):
+        self.frame_count = frame_count
+        self.pixel_count = pixel_count
+        # v2 led data rows have a shorter end frame (BMP2LED.dotstar_row_size)
+        self.frame_size = frame_size or BMP2LED.column_frame_size(pixel_count)
+        # pixel start byte currently in the frames
+        self.pixel_header = pixel_header
+        self.backwards = False
+
+    def __len__(self):
+        return self.frame_count
+
+    @property
+    def ram_size(self):
+        """RAM used by the frame data (that would be freed by close)."""
+        return 0
+
+    def prepare(self, backwards=False):
+        """Select paint order for the next stroke."""
+        self.backwards = backwards
+
+    def frame(self, index):
+        """
+        Frame at position `index` in paint order.
+
+        abstract - every store implements it for its backend.
+        """
+        raise TypeError(
+            "{} does not implement FrameStore.frame".format(type(self).__name__)
+        )
+
+    def set_pixel_header(self, pixel_header):
+        """Set the per pixel start byte (global brightness) of all frames."""
+        self.pixel_header = pixel_header
+
+    def advance(self):
+        """Stroke done - animations switch to their next image."""
+        pass
+
+    def close(self):
+        pass
+
+
+class RAMFrameStore(FrameStore):
+    """Frames in one bytearray - fastest, but needs the whole image in RAM."""
+
+    def __init__(self, buffer, *, frame_count, pixel_count, pixel_header=0xFF):
+        super(RAMFrameStore, self).__init__(
+            frame_count=frame_count,
+            pixel_count=pixel_count,
+            pixel_header=pixel_header,
+        )
+        self.buffer = buffer
+        # one memoryview per frame - and the same in reversed order.
+        # → no allocations and no index math while painting.
+        view = memoryview(self.buffer)
+        self.frames = [
+            view[index * self.frame_size : (index + 1) * self.frame_size]
+            for index in range(self.frame_count)
+        ]
+        self.frames_reversed = list(reversed(self.frames))
+        self.order = self.frames
+
+    @property
+    def ram_size(self):
+        return len(self.buffer)
+
+    def prepare(self, backwards=False):
+        self.backwards = backwards
+        self.order = self.frames_reversed if backwards else self.frames
+
+    def frame(self, index):
+        return self.order[index]
+
+    def set_pixel_header(self, pixel_header):
+        if pixel_header != self.pixel_header:
+            # patch in RAM - takes some ms instead of a re-conversion.
+            BMP2LED.set_pixel_headers(self.buffer, self.pixel_count, pixel_header)
+        self.pixel_header = pixel_header
+
+    def close(self):
+        self.frames = []
+        self.frames_reversed = []
+        self.order = self.frames
+        self.buffer = bytearray(0)
+
+
+class FileFrameStore(FrameStore):
+    """
+    Frames in a file on flash - read page by page.
+
+    only one page of `page_frames` frames is held in RAM.
+    every page is filled with one readinto() - the frames are handed out as
+    memoryview slices of the page (ring of frame buffers).
+    """
+
+    def __init__(
+        self,
+        filename,
+        *,
+        frame_count,
+        pixel_count,
+        pixel_header=0xFF,
+        page_frames=8,
+        frame_size=None,
+        page=None,
+    ):
+        super(FileFrameStore, self).__init__(
+            frame_count=frame_count,
+            pixel_count=pixel_count,
+            pixel_header=pixel_header,
+            frame_size=frame_size,
+        )
+        self.filename = filename
+        # pixel start byte stored in the file
+        self.file_pixel_header = pixel_header
+        self.file = open(self.filename, "rb")
+        page_frames = max(1, min(page_frames, self.frame_count))
+        if page is None or len(page) < page_frames * self.frame_size:
+            page = bytearray(page_frames * self.frame_size)
+        # (a preallocated page can be reused for the next store)
+        self.page = page
+        page_view = memoryview(self.page)
+        self.page_read = page_view[: page_frames * self.frame_size]
+        page_array = ulab.numpy.frombuffer(self.page, dtype=ulab.numpy.uint8)
+        self.slots = []
+        self.slot_headers = []
+        for slot in range(page_frames):
+            start = slot * self.frame_size
+            self.slots.append(page_view[start : start + self.frame_size])
+            self.slot_headers.append(
+                page_array[start + 4 : start + 4 + 4 * self.pixel_count : 4]
+            )
+        self.page_start = 0
+        self.page_end = 0
+
+    @property
+    def ram_size(self):
+        return len(self.page)
+
+    def load_page(self, index):
+        """Read the page containing frame `index` (in file order)."""
+        page_frames = len(self.slots)
+        if self.backwards:
+            start = max(0, index - page_frames + 1)
+        else:
+            start = max(0, min(index, self.frame_count - page_frames))
+        self.file.seek(start * self.frame_size)
+        self.file.readinto(self.page_read)
+        self.page_start = start
+        self.page_end = min(start + page_frames, self.frame_count)
+        if self.pixel_header != self.file_pixel_header:
+            for header_view in self.slot_headers:
+                header_view[:] = self.pixel_header
+
+    def frame(self, index):
+        if self.backwards:
+            index = self.frame_count - 1 - index
+        if not self.page_start <= index < self.page_end:
+            self.load_page(index)
+        return self.slots[index - self.page_start]
+
+    def set_pixel_header(self, pixel_header):
+        self.pixel_header = pixel_header
+        # re-read on next access
+        self.page_end = 0
+
+    def close(self):
+        self.file.close()
+
+
+class FrozenFrameStore(FrameStore):
+    """
+    Frames in read-only bytes - e.g. a module frozen into the firmware
+    (see tools/bmp2led_compile.py --frozen-module). no RAM for the image data.
+
+    the frames are stored with pixel header 0xFF -
+    for other global brightness values every frame is copied and patched.
+    """
+
+    def __init__(self, data, *, frame_count, pixel_count):
+        super(FrozenFrameStore, self).__init__(
+            frame_count=frame_count,
+            pixel_count=pixel_count,
+            pixel_header=0xFF,
+        )
+        view = memoryview(data)
+        self.frames = [
+            view[index * self.frame_size : (index + 1) * self.frame_size]
+            for index in range(self.frame_count)
+        ]
+        self.frames_reversed = list(reversed(self.frames))
+        self.order = self.frames
+        self.scratch = bytearray(self.frame_size)
+        self.scratch_view = memoryview(self.scratch)
+        self.scratch_header = ulab.numpy.frombuffer(
+            self.scratch, dtype=ulab.numpy.uint8
+        )[4 : 4 + 4 * self.pixel_count : 4]
+
+    def prepare(self, backwards=False):
+        self.backwards = backwards
+        self.order = self.frames_reversed if backwards else self.frames
+
+    def frame(self, index):
+        frame = self.order[index]
+        if self.pixel_header == 0xFF:
+            return frame
+        self.scratch_view[:] = frame
+        self.scratch_header[:] = self.pixel_header
+        return self.scratch_view
+
+
+class GeneratorFrameStore(FrameStore):
+    """
+    Frames rendered on the fly by a pattern (see patterns.py).
+
+    no image file and no flash access - every frame is rendered into one
+    preallocated frame buffer right before it is written.
+    if the pattern needs more than `budget_ns` for a column,
+    all columns are rendered once into RAM before the next stroke.
+    (for both directions if the pattern is `directional`)
+    """
+
+    def __init__(
+        self,
+        pattern,
+        *,
+        frame_count,
+        pixel_count,
+        color_order,
+        pixel_header=0xFF,
+        value=255,
+        budget_ns=500_000,
+    ):
+        super(GeneratorFrameStore, self).__init__(
+            frame_count=frame_count,
+            pixel_count=pixel_count,
+            pixel_header=pixel_header,
+        )
+        self.pattern = pattern
+        self.pattern.setup(
+            pixel_count=pixel_count, frame_count=frame_count, value=value
+        )
+        self.buffer = bytearray(self.frame_size)
+        self.buffer_view = memoryview(self.buffer)
+        array = ulab.numpy.frombuffer(self.buffer, dtype=ulab.numpy.uint8)
+        end = 4 + 4 * pixel_count
+        self.header = array[4:end:4]
+        self.red = array[5 + color_order.find("r") : end : 4]
+        self.green = array[5 + color_order.find("g") : end : 4]
+        self.blue = array[5 + color_order.find("b") : end : 4]
+        self.header[:] = pixel_header
+        self.budget_ns = budget_ns
+        # slowest column render time seen
+        self.render_ns_max = 0
+        # RAMFrameStore with all columns per direction - if the pattern is too slow
+        self.caches = None
+        # cache of the current stroke direction
+        self.cache = None
+
+    @property
+    def ram_size(self):
+        size = len(self.buffer)
+        if self.caches:
+            size += self.caches[False].ram_size
+            if self.caches[True] is not self.caches[False]:
+                size += self.caches[True].ram_size
+        return size
+
+    def prerender_direction(self, backwards):
+        buffer = bytearray(self.frame_count * self.frame_size)
+        for column in range(self.frame_count):
+            self.pattern.render(column, self.red, self.green, self.blue, backwards)
+            start = column * self.frame_size
+            buffer[start : start + self.frame_size] = self.buffer
+        return RAMFrameStore(
+            buffer,
+            frame_count=self.frame_count,
+            pixel_count=self.pixel_count,
+            pixel_header=self.pixel_header,
+        )
+
+    def prerender(self):
+        """Render all columns into RAM."""
+        try:
+            forward = self.prerender_direction(False)
+            backward = forward
+            if self.pattern.directional:
+                backward = self.prerender_direction(True)
+        except MemoryError:
+            print("GeneratorFrameStore: no RAM to prerender - keep rendering live.")
+            self.budget_ns = None
+            gc.collect()
+            return
+        self.caches = {False: forward, True: backward}
+
+    def prepare(self, backwards=False):
+        self.backwards = backwards
+        if (
+            self.caches is None
+            and self.budget_ns is not None
+            and self.render_ns_max > self.budget_ns
+        ):
+            print(
+                "GeneratorFrameStore: {:.0f}us per column - prerender.".format(
+                    self.render_ns_max / 1000
+                )
+            )
+            self.prerender()
+        if self.caches:
+            self.cache = self.caches[backwards]
+            self.cache.prepare(backwards)
+
+    def frame(self, index):
+        if self.cache:
+            return self.cache.frame(index)
+        start_ns = time.monotonic_ns()
+        column = index
+        if self.backwards:
+            column = self.frame_count - 1 - index
+        self.pattern.render(column, self.red, self.green, self.blue, self.backwards)
+        duration_ns = time.monotonic_ns() - start_ns
+        if duration_ns > self.render_ns_max:
+            self.render_ns_max = duration_ns
+        return self.buffer_view
+
+    def set_pixel_header(self, pixel_header):
+        self.pixel_header = pixel_header
+        self.header[:] = pixel_header
+        if self.caches:
+            self.caches[False].set_pixel_header(pixel_header)
+            self.caches[True].set_pixel_header(pixel_header)
+
+    def close(self):
+        if self.caches:
+            self.caches[False].close()
+            self.caches[True].close()
+            self.caches = None
+            self.cache = None
+
+
+class TextFrameStore(FrameStore):
+    """
+    Text rendered with a GlyphCache (see pov_text.py).
+
+    the frames are memoryviews into the cached glyph columns -
+    `set_text` only renders glyphs that are not cached yet.
+    """
+
+    def __init__(self, glyph_cache, text, *, column_repeat=1, padding=0):
+        super(TextFrameStore, self).__init__(
+            frame_count=0,
+            pixel_count=glyph_cache.pixel_count,
+            pixel_header=glyph_cache.pixel_header,
+        )
+        self.glyph_cache = glyph_cache
+        self.column_repeat = column_repeat
+        self.padding = padding
+        self.text = None
+        self.frames = []
+        self.frames_reversed = []
+        self.order = self.frames
+        self.set_text(text)
+
+    @property
+    def ram_size(self):
+        return self.glyph_cache.ram_size
+
+    def set_text(self, text, *, force=False):
+        """Returns True if the frames changed. (call between strokes)"""
+        if text == self.text and not force:
+            return False
+        self.text = text
+        self.frames = self.glyph_cache.columns(
+            text, column_repeat=self.column_repeat, padding=self.padding
+        )
+        self.frames_reversed = list(reversed(self.frames))
+        self.frame_count = len(self.frames)
+        self.prepare(self.backwards)
+        return True
+
+    def set_value(self, value):
+        """new color intensity - all glyphs are rendered again."""
+        if value != self.glyph_cache.value:
+            self.glyph_cache.set_value(value)
+            self.set_text(self.text, force=True)
+
+    def prepare(self, backwards=False):
+        self.backwards = backwards
+        self.order = self.frames_reversed if backwards else self.frames
+
+    def frame(self, index):
+        return self.order[index]
+
+    def set_pixel_header(self, pixel_header):
+        self.glyph_cache.set_pixel_header(pixel_header)
+        self.pixel_header = pixel_header
+
+    def close(self):
+        # the glyph cache is kept by POVPainter for the next text
+        self.frames = []
+        self.frames_reversed = []
+        self.order = self.frames
+
+
+class AnimationFrameStore(FrameStore):
+    """
+    Animation - several images in one frame store.
+
+    `store` holds the columns of all images back to back,
+    `index` is the table of (first column, column count) per image.
+    every stroke paints one image - `advance()` selects the next one.
+    (only an offset change - no file open and no conversion)
+    """
+
+    def __init__(self, store, index):
+        super(AnimationFrameStore, self).__init__(
+            frame_count=index[0][1],
+            pixel_count=store.pixel_count,
+            pixel_header=store.pixel_header,
+            frame_size=store.frame_size,
+        )
+        self.store = store
+        self.index = index
+        self.image = 0
+        self.offset = 0
+
+    @property
+    def ram_size(self):
+        return self.store.ram_size
+
+    def select(self, image):
+        self.image = image % len(self.index)
+        self.frame_count = self.index[self.image][1]
+
+    def advance(self):
+        self.select(self.image + 1)
+
+    def prepare(self, backwards=False):
+        self.backwards = backwards
+        self.store.prepare(backwards)
+        start, count = self.index[self.image]
+        if backwards:
+            # the store counts from its last column
+            start = len(self.store) - start - count
+        self.offset = start
+
+    def frame(self, index):
+        return self.store.frame(self.offset + index)
+
+    def set_pixel_header(self, pixel_header):
+        self.store.set_pixel_header(pixel_header)
+        self.pixel_header = pixel_header
+
+    def close(self):
+        self.store.close()
+
+
+class StrideFrameStore(FrameStore):
+    """Every `stride`-th frame of `store` - lower resolution without extra RAM."""
+
+    def __init__(self, store, stride):
+        super(StrideFrameStore, self).__init__(
+            frame_count=(store.frame_count + stride - 1) // stride,
+            pixel_count=store.pixel_count,
+            pixel_header=store.pixel_header,
+            frame_size=store.frame_size,
+        )
+        self.store = store
+        self.stride = stride
+
+    def prepare(self, backwards=False):
+        self.backwards = backwards
+        self.store.prepare(backwards)
+
+    def frame(self, index):
+        return self.store.frame(index * self.stride)
+
+    def set_pixel_header(self, pixel_header):
+        self.store.set_pixel_header(pixel_header)
+        self.pixel_header = pixel_header
+
+    # the store belongs to the full resolution level.
+
+
+class PyramidFrameStore(FrameStore):
+    """
+    One image at several column counts (mip levels).
+
+    level 0 is the full image, every further level has half the columns.
+    `select` a level before the stroke - fast strokes use fewer columns,
+    so the whole image still fits into the stroke.
+    """
+
+    def __init__(self, levels):
+        store = levels[0]
+        super(PyramidFrameStore, self).__init__(
+            frame_count=store.frame_count,
+            pixel_count=store.pixel_count,
+            pixel_header=store.pixel_header,
+            frame_size=store.frame_size,
+        )
+        self.levels = levels
+        self.level = 0
+        self.store = store
+
+    @property
+    def ram_size(self):
+        return sum(store.ram_size for store in self.levels)
+
+    def select(self, level):
+        self.level = min(max(0, level), len(self.levels) - 1)
+        self.store = self.levels[self.level]
+        self.frame_count = self.store.frame_count
+
+    def prepare(self, backwards=False):
+        self.backwards = backwards
+        self.store.prepare(backwards)
+
+    def frame(self, index):
+        return self.store.frame(index)
+
+    def set_pixel_header(self, pixel_header):
+        for store in self.levels:
+            store.set_pixel_header(pixel_header)
+        self.pixel_header = pixel_header
+
+    def close(self):
+        for store in self.levels:
+            store.close()
+
+
 ##########################################
 # main class
 
@@ -89,22 +648,126 @@ class POVPainter(ModeBaseClass):
         "POVPainter": {
             "paint_mode_classic": True,
             "image_folder": "/images",
+            # header index of image_folder - so startup does not open every image.
+            "image_index_file": "/image_index.json",
             "temp_file": "/led.dat",
+            # keep converted images - switching back to an image is then only a file open.
+            # set to None to always convert into `temp_file`
+            "led_cache_folder": "/led_cache",
             "led_data_file_benchmark": "/led_benchmark.dat",
+            # hardware timing profile - measured once per hardware config.
+            # (serial command `calibrate` forces a new measurement)
+            "calibration_file": "/calibration.json",
+            # SPI stream capture for tools/pov_simulate.py
+            # (serial command `capture [strokes]`)
+            "spi_capture_file": "/spi_capture.bin",
+            "spi_capture_max_bytes": 128 * 1024,
+            # end a stroke as soon as a button event is queued
+            # (input latency: one column instead of one stroke)
+            "paint_abortable": True,
+            # lower resolution levels of v1 images (half the columns each) -
+            # fast strokes use a level the spi bus can deliver in time.
+            # RAM images are averaged in the background (while the RAM above
+            # frame_store_ram_reserve allows it), others skip columns.
+            "pyramid_levels": 3,
+            "pyramid_min_columns": 16,
+            # part of the calibrated spi throughput to plan with
+            "pyramid_rate_margin": 0.9,
+            # column timing statistics (statusline and serial command `stats`)
+            "paint_stats": False,
+            # columns per stroke kept for the statistics
+            "paint_stats_size": 512,
+            # where to keep v1 images: "auto", "ram", "file" or "frozen"
+            # auto: frozen if available, RAM if the image fits, else flash file.
+            "frame_store": "auto",
+            # free RAM to keep when deciding for a RAM frame store (bytes)
+            "frame_store_ram_reserve": 64 * 1024,
+            # flash frame store: file and frames read per page
+            "frame_store_file": "/frames.dat",
+            "frame_store_page_frames": 8,
+            # v2: rows read with one readinto() - None: tune from FAT cluster size
+            "v2_batch_rows": None,
+            # v2 auto tuning: read at least this many bytes (whole clusters)
+            "v2_read_size_min": 4096,
+            # module with images frozen into the firmware
+            "frozen_images_module": "frozen_images",
+            # procedural patterns (see patterns.py) - shown as images
+            # named `pattern:<name>`. always available if there are no image files.
+            "patterns": ["direction", "gradient", "diagonal", "checkerboard"],
+            "patterns_always": False,
+            # image width of patterns (None: square - pixel_count columns)
+            "pattern_columns": None,
+            # max render time per column before a pattern is prerendered to RAM
+            "pattern_budget": 0.0005,
+            # animations - one image per stroke.
+            # "<image>.bmp": n  → sprite sheet with n images side by side
+            # "<directory>": None  → all BMPs in the directory (alphabetical)
+            # "animations": {"walk.bmp": 8, "bounce": None},
+            "animations": {},
+            # texts - shown as images named `text:<text>`.
+            # `{clock}` is replaced with the current RTC time.
+            # "texts": ["Hello", "{clock}"],
+            "texts": [],
+            "text_font": "/Overlock-Bold-40.bdf",
+            "text_color": (255, 255, 255),
+            # pixel rows per font row (None: as big as fits the strip)
+            "text_scale": None,
+            # paint every glyph column n times (stretch the text)
+            "text_column_repeat": 1,
+            # dark columns before and after the text
+            "text_padding": 4,
+            # gets hour, minute, second
+            "text_clock_format": "{:02d}:{:02d}",
+            # seconds between clock text checks
+            "text_clock_interval": 0.5,
+            # convert in the background and paint the rows that are already done.
+            # (v2 only)
+            "stream_conversion": True,
+            # prepare the next image in the background (in main_loop)
+            # and keep painting the current image until the new one is complete.
+            # (v2: used if stream_conversion is off)
+            "background_loading": True,
+            # max time per main_loop call for background loading in seconds
+            "loading_slice": 0.02,
             # Correction for perceptually linear brightness
             "gamma": 2.4,
+            # convert images with integer lookup tables (fast)
+            # instead of per row float gamma math
+            "bmp2led_use_lut": True,
+            # use the APA102 5-bit global brightness per pixel for 13 bit resolution.
+            # less banding in dark images / at low brightness.
+            # the global brightness field is then used by the image data -
+            # so brightness is baked in (`brightness_at_paint_time` is ignored)
+            "bmp2led_hdr": False,
             # draw / stroke duration in seconds
             # "times": ["1/8", "1/4", "1/3", "1/2", "2/3", "1", "1.5", "2", "3", "4"],
             "draw_duration": 0.7,
+            # column timing within a stroke
+            # "linear": constant column period (pixel delay)
+            # "sine": model the hand stroke as sine movement and place the
+            #   columns at equal distances - no squashed image edges.
+            #   (needs stable stroke durations - falls back to linear)
+            "timing_profile": "linear",
+            # part of the stroke distance the image covers in "sine" mode
+            "stroke_fill": 0.8,
+            # time between direction change and paint start in seconds
+            # per stroke direction. tune to align the images of both directions.
+            "paint_latency_forward": 0.004,
+            "paint_latency_backward": 0.004,
             "brightness": 0.01,
             # Min, max brightness (0.0-1.0)
             # "brightness_range": (0.004, 0.75),
             "brightness_range": (0.2, 0.75),
+            # store full scale (gamma corrected) colors and apply brightness while painting
+            # with the APA102 5-bit global brightness field.
+            # → brightness changes do not need a re-conversion.
+            # (False: brightness is baked into the led data as before)
+            "brightness_at_paint_time": True,
             "loop": False,
         },
     }
 
-    def __init__(self, *, config={}, print_fn, accel_sensor):
+    def __init__(self, *, config={}, print_fn, accel_sensor, input_events=None):
         super(POVPainter, self).__init__(config=config, print_fn=print_fn)
         self.print = print
         self.print(42 * "*")
@@ -117,6 +780,15 @@ class POVPainter(ModeBaseClass):
         # self.config_print()
 
         self.accel_sensor = accel_sensor
+        # keypad.EventQueue - checked while painting (see paint_frames).
+        # the only input that can end a stroke: the main loop is single
+        # threaded, so a mode switch (button 0) ends the stroke through its
+        # queued event and is handled right after it.
+        self.input_events = None
+        if self.config["POVPainter"]["paint_abortable"]:
+            self.input_events = input_events
+        # strokes ended early by input
+        self.paint_aborts = 0
 
         # prepare internals
         self.spi_init_done = False
@@ -143,8 +815,49 @@ class POVPainter(ModeBaseClass):
         self.pixel_delay_raw = self.pixel_delay
         # self.pixel_delay = 0.0
         self.paint_duration = 0
-
-        self.image_buffer = bytearray(0)
+        # column timing: pixel_delay is the column period.
+        # every column gets an absolute deadline from the stroke start -
+        # the time dotstar.write needs is already included.
+        # remaining slack bigger than this is slept away, the rest busy-waited.
+        # (time.sleep is not precise enough for sub millisecond timing)
+        self.busy_wait_ns = 2_000_000
+        self.paint_stats = None
+        if self.config["POVPainter"]["paint_stats"]:
+            self.paint_stats = PaintStats(self.config["POVPainter"]["paint_stats_size"])
+        # time between direction change and paint start - per direction.
+        # (indexed by `backwards`)
+        self.paint_latency = {
+            False: self.config["POVPainter"]["paint_latency_forward"],
+            True: self.config["POVPainter"]["paint_latency_backward"],
+        }
+        # both directions start the image this long after the direction change
+        self.paint_latency_max = max(self.paint_latency.values())
+        self.timing_profile = self.config["POVPainter"]["timing_profile"]
+        self.stroke_fill = self.config["POVPainter"]["stroke_fill"]
+        # averaged duration of the current stroke direction (None = not stable)
+        self.stroke_duration = None
+        # duration of the current stroke (None = not stable) - v2 row period
+        self.stroke_time = None
+        # cached tables per direction: (key, table)
+        self._schedules = {False: (None, [0]), True: (None, [0])}
+        # v2 bulk reads - set in first_run_init (needs row_size)
+        self.v2_batch_rows = self.config["POVPainter"]["v2_batch_rows"]
+        self.v2_page = None
+        # columns that missed their deadline in the last stroke
+        self.paint_overruns = 0
+        self.paint_overrun_max_ns = 0
+
+        # v1 image - one frame per column
+        self.frame_store = None
+        self.frame_store_kind = self.config["POVPainter"]["frame_store"]
+        self.frame_store_ram_reserve = self.config["POVPainter"][
+            "frame_store_ram_reserve"
+        ]
+        self.frame_store_file = self.config["POVPainter"]["frame_store_file"]
+        self.frame_store_page_frames = self.config["POVPainter"][
+            "frame_store_page_frames"
+        ]
+        self.frozen_images_module = self.config["POVPainter"]["frozen_images_module"]
         self.bmpHeight = 0
         self.bmpWidth = 0
 
@@ -153,13 +866,54 @@ class POVPainter(ModeBaseClass):
             pixel_count=self.pixel_count,
             color_order=self.config["hw"]["pixel_color_order"],
             gamma=self.config["POVPainter"]["gamma"],
+            use_lut=self.config["POVPainter"]["bmp2led_use_lut"],
+            hdr=self.config["POVPainter"]["bmp2led_hdr"],
+        )
+        # prebuilt off / status frames
+        self.control_frames = ControlFrames(
+            pixel_count=self.pixel_count,
+            color_order=self.config["hw"]["pixel_color_order"],
         )
         self.path = self.config["POVPainter"]["image_folder"]
         self.tempfile = self.config["POVPainter"]["temp_file"]
+        # file that paint_v2 plays
+        self.led_data_file = self.tempfile
+        self.led_cache = None
+        if self.config["POVPainter"]["led_cache_folder"]:
+            self.led_cache = LEDCache(
+                path=self.config["POVPainter"]["led_cache_folder"],
+                writeable=self.fs_writeable,
+            )
         self.led_data_file_benchmark = self.config["POVPainter"][
             "led_data_file_benchmark"
         ]
+        self.stream_conversion = self.config["POVPainter"]["stream_conversion"]
+        self.background_loading = self.config["POVPainter"]["background_loading"]
+        self.loading_slice_ns = int(
+            self.config["POVPainter"]["loading_slice"] * 1_000_000_000
+        )
+        # second file for double buffered conversion without cache
+        self.tempfile_alt = self.tempfile + ".next"
+        # running BMP2LED.process_iter generator
+        self.conversion = None
+        self.conversion_cache_key = None
+        self.conversion_output = None
+        # True: paint the rows that are done. False: swap when complete.
+        self.conversion_streaming = True
+        # running BMP2LED.read_columns_iter generator (v1)
+        self.loading = None
+        self.loading_filename = None
+        self.loading_pixel_header = None
+        self.loading_start_time = 0
+        # running pyramid_build_iter generator (v1)
+        self.pyramid_building = None
         self.brightness_range = self.config["POVPainter"]["brightness_range"]
+        self.brightness_at_paint_time = (
+            self.config["POVPainter"]["brightness_at_paint_time"]
+            and not self.bmp2led.hdr
+        )
+        # APA102 per pixel start byte: 0b111 + 5-bit global brightness
+        self.pixel_header = 0xFF
 
         # self.times = self.config["POVPainter"]["times"]
         # self.times.sort(key=eval)  # Ensure times are shortest-to-longest
@@ -167,23 +921,40 @@ class POVPainter(ModeBaseClass):
 
         # TODO: try https://github.com/adafruit/Adafruit_CircuitPython_DotStar/blob/main/examples/dotstar_image_pov.py
         # Get list of compatible BMP images in path
-        self.images = self.bmp2led.scandir(self.path)
+        self.images = self.bmp2led.scandir(
+            self.path, index_filename=self.config["POVPainter"]["image_index_file"]
+        )
+        self.testpattern_store = None
         if not self.images:
-            print("no images found. using testpattern.")
-            # TODO implement / generate test-pattern
-            # https://docs.circuitpython.org/projects/display-shapes/en/latest/api.html#adafruit_display_shapes.rect.Rect
-            # https://learn.adafruit.com/circuitpython-display-support-using-displayio/library-overview
-            # https://docs.circuitpython.org/en/latest/shared-bindings/bitmaptools/index.html#bitmaptools.draw_line
+            print("no images found. using test patterns.")
         else:
             print("found images at '" + self.path + "':")
             for img in self.images:
                 print("  ", img)
+        if not self.images or self.config["POVPainter"]["patterns_always"]:
+            for name in self.config["POVPainter"]["patterns"] or ["direction"]:
+                self.images.append(self.pattern_prefix + name)
+        for text in self.config["POVPainter"]["texts"]:
+            self.images.append(self.text_prefix + text)
+        self.animations = self.config["POVPainter"]["animations"]
+        for name in self.animations:
+            # sequence directories are not found by scandir
+            if name not in self.images:
+                self.images.append(name)
+        self.glyph_cache = None
+        self.text_template = None
+        self.text_clock_interval_ns = int(
+            self.config["POVPainter"]["text_clock_interval"] * 1_000_000_000
+        )
+        self.text_clock_next_ns = 0
 
         self.image_num = 0  # Current selected image index in self.path
-        self.filename = self.path + "/" + self.images[self.image_num]
+        self.filename = self.image_filename(self.images[self.image_num])
 
         self.num_rows = 0  # Nothing loaded yet
         self.loop = self.config["POVPainter"]["loop"]  # Repeat image playback
+        # led data file ends with the 'all off' row (complete file, loop off)
+        self.off_row = False
         # LED brightness, 0.0 (off) to 1.0 (bright)
         self.brightness = self.config["POVPainter"]["brightness"]
         self.config_mode = 0  # Current setting being changed
@@ -196,6 +967,19 @@ class POVPainter(ModeBaseClass):
         # only setup things..
         self.rows_per_second = -1
         self.row_size = -1
+        self.spi_baudrate = 12000000
+        # SPICapture while capturing strokes (see capture_start)
+        self.capture = None
+        self.capture_strokes = 0
+        # running spi_tune without loopback - waits for the answer of the user
+        self.tune_state = None
+        self.calibration = Calibration(
+            filename=self.config["POVPainter"]["calibration_file"],
+            key=hw_key(self.config),
+        )
+        if self.calibration.load():
+            # highest stable rate found by spi_tune for this strip
+            self.spi_baudrate = self.calibration.profile["baudrate"]
 
         # start pixel...
         self.spi_init()
@@ -237,19 +1021,47 @@ class POVPainter(ModeBaseClass):
             self.brightness_range[0],
             self.brightness_range[1],
         )
-        if self.spi_init_done:
+        if self.brightness_at_paint_time:
+            self.update_pixel_header()
+        elif self.spi_init_done:
             self.load_image()
 
     @property
     def brightness_mapped(self):
         return ModeBaseClass.brightness
 
+    @property
+    def conversion_brightness(self):
+        """brightness to bake into the led data."""
+        if self.brightness_at_paint_time:
+            return 1.0
+        return self.brightness_mapped
+
+    def update_pixel_header(self):
+        """
+        Calculate APA102 global brightness for brightness_mapped.
+
+        The led data is stored gamma corrected at full scale.
+        baked brightness is applied before the gamma correction:
+            (value * brightness) ** gamma = value ** gamma * brightness ** gamma
+        the global brightness field scales the led current linear -
+        so we need brightness ** gamma in 31 steps.
+        """
+        level = int(self.brightness_mapped**self.bmp2led.gamma * 31 + 0.5)
+        level = helper.limit(level, 1, 31)
+        self.pixel_header = 0xE0 | level
+        # led data files: paint_v2 patches every page while painting.
+        # frame stores (also the patterns, texts and animations
+        # paint_v2 hands to paint_v1) are patched here.
+        if self.frame_store is not None:
+            self.frame_store.set_pixel_header(self.pixel_header)
+
     ##########################################
     # sub system init
 
     def first_run_init(self):
-        # Determine filesystem-to-LEDs throughput (also clears LED strip)
-        self.rows_per_second, self.row_size = self.benchmark()
+        # Determine filesystem-to-LEDs throughput
+        self.calibration_load()
         self.clear_strip()
         print(
             "rows_per_second: {}, row_size: {}".format(
@@ -263,6 +1075,13 @@ class POVPainter(ModeBaseClass):
     def spi_init(self):
         # deactivate internal displays...
         # displayio.release_displays()
+        # optional: MISO wired to the data output of the last pixel
+        # for spi_tune loopback checks.
+        loopback_pin = None
+        if self.config["hw"]["pixel_spi_pins"].get("loopback"):
+            loopback_pin = helper.get_pin(
+                config=self.config, bus_name="pixel_spi_pins", pin_name="loopback"
+            )
         self.dotstar = busio.SPI(
             clock=helper.get_pin(
                 config=self.config, bus_name="pixel_spi_pins", pin_name="clock"
@@ -270,15 +1089,14 @@ class POVPainter(ModeBaseClass):
             MOSI=helper.get_pin(
                 config=self.config, bus_name="pixel_spi_pins", pin_name="data"
             ),
+            MISO=loopback_pin,
         )
+        self.spi_loopback = loopback_pin is not None
         while not self.dotstar.try_lock():
             pass
-        self.dotstar.configure(baudrate=12000000)
+        self.dotstar.configure(baudrate=self.spi_baudrate)
         # initially set to black
-        self.dotstar.write(bytearray([0x00, 0x00, 0x00, 0x00]))
-        for r in range(36 * 5):
-            self.dotstar.write(bytearray([0xFF, 0x00, 0x00, 0x00]))
-        self.dotstar.write(bytearray([0xFF, 0xFF, 0xFF, 0xFF]))
+        self.dotstar.write(self.control_frames.init)
 
         if self.first_run:
             self.first_run_init()
@@ -286,7 +1104,166 @@ class POVPainter(ModeBaseClass):
 
         self.spi_init_done = True
 
+    def calibration_load(self, force=False):
+        """
+        Get throughput from the calibration profile.
+
+        only measures if there is no profile for this hardware config (or forced).
+        """
+        self.row_size = self.bmp2led.dotstar_row_size
+        if force or not self.calibration.profile:
+            if not self.fs_writeable:
+                # no profile and no way to store one - quick boot benchmark.
+                self.rows_per_second, self.row_size = self.benchmark()
+                return
+            self.calibration.calibrate(
+                self.dotstar,
+                pixel_count=self.pixel_count,
+                baudrate=self.spi_baudrate,
+                filename=self.led_data_file_benchmark,
+            )
+            self.calibration.save()
+        print(self.calibration)
+        if not self.config["POVPainter"]["v2_batch_rows"]:
+            # whole FAT clusters - the profile only knows the tested batch sizes
+            self.v2_batch_rows = self.v2_batch_rows_tune()
+        self.rows_per_second = self.calibration.rows_per_second(
+            baudrate=self.spi_baudrate, batch_rows=self.v2_batch_rows
+        )
+
+    spi_tune_baudrates = (
+        4_000_000,
+        8_000_000,
+        12_000_000,
+        16_000_000,
+        20_000_000,
+        24_000_000,
+        32_000_000,
+        40_000_000,
+    )
+
+    def spi_test_frame(self, marker_count=0):
+        """
+        Strip frame with a dim red / green / blue sequence and white last pixel.
+
+        marker_count: extra pixel frames after the strip
+        - they pass the whole strip (for loopback check).
+        """
+        frame = bytearray(
+            4 + 4 * (self.pixel_count + marker_count) + (self.pixel_count + 15) // 16
+        )
+        on = 0x40
+        for pixel in range(self.pixel_count + marker_count):
+            color = [0, 0, 0]
+            if pixel >= self.pixel_count - 1:
+                color = [on, on, on]
+            else:
+                color[pixel % 3] = on
+            frame[4 + pixel * 4 : 8 + pixel * 4] = bytes([0xE1] + color)
+        frame[4 + 4 * (self.pixel_count + marker_count) :] = b"\xFF" * (
+            (self.pixel_count + 15) // 16
+        )
+        return frame
+
+    def spi_check(self, baudrate):
+        """
+        Check that the strip shows the test frame correctly at the current rate.
+
+        Returns True / False with loopback - None if the user has to answer.
+        """
+        if self.spi_loopback:
+            marker_count = 4
+            frame = self.spi_test_frame(marker_count)
+            readback = bytearray(len(frame))
+            self.dotstar.write_readinto(frame, readback)
+            # the pixels consume their own frames and pass the markers on
+            marker = frame[
+                4 + 4 * self.pixel_count : 4 + 4 * (self.pixel_count + marker_count)
+            ]
+            return bytes(marker) in bytes(readback)
+        # no loopback - ask the user. (the answer comes with handle_command)
+        frame = self.spi_test_frame()
+        start = time.monotonic()
+        while time.monotonic() - start < 1.0:
+            self.dotstar.write(frame)
+        print(
+            "{:>5.1f}MHz: strip shows red/green/blue and white last pixel? [y/n] "
+            "".format(baudrate / 1_000_000)
+        )
+        return None
+
+    def spi_tune(self):
+        """
+        Find the highest stable baudrate for this strip.
+
+        steps the baudrate up until the test frame check fails.
+        without loopback every step waits for the answer of the user
+        (serial input 'y' / 'n' - see spi_tune_answer).
+        the result is stored in the calibration profile
+        (per hardware config - pixel_count, pins, ..)
+        """
+        print("spi_tune: current {}Hz".format(self.spi_baudrate))
+        self.tune_state = {"index": 0, "stable": None}
+        self.spi_tune_step()
+
+    def spi_tune_step(self):
+        """Check baudrates until one fails or needs an answer of the user."""
+        state = self.tune_state
+        while state["index"] < len(self.spi_tune_baudrates):
+            baudrate = self.spi_tune_baudrates[state["index"]]
+            self.dotstar.configure(baudrate=baudrate)
+            result = self.spi_check(baudrate)
+            if result is None:
+                # wait for spi_tune_answer
+                return
+            if not result:
+                print("spi_tune: {}Hz failed.".format(baudrate))
+                break
+            state["stable"] = baudrate
+            state["index"] += 1
+        self.spi_tune_finish()
+
+    def spi_tune_answer(self, input_string):
+        """Answer for the running spi_tune check."""
+        answer = input_string.strip().lower()
+        if not answer.startswith(("y", "n")):
+            print("spi_tune: please answer 'y' or 'n'.")
+            return
+        state = self.tune_state
+        baudrate = self.spi_tune_baudrates[state["index"]]
+        if answer.startswith("n"):
+            print("spi_tune: {}Hz failed.".format(baudrate))
+            self.spi_tune_finish()
+            return
+        state["stable"] = baudrate
+        state["index"] += 1
+        self.spi_tune_step()
+
+    def spi_tune_finish(self):
+        stable = self.tune_state["stable"]
+        self.tune_state = None
+        self.clear_strip()
+        if stable is None:
+            print("spi_tune: no stable baudrate found. keep current.")
+            self.dotstar.configure(baudrate=self.spi_baudrate)
+            return
+        self.spi_baudrate = stable
+        self.dotstar.configure(baudrate=self.spi_baudrate)
+        print("spi_tune: use {}Hz".format(self.spi_baudrate))
+        if self.calibration.profile:
+            self.calibration.profile["baudrate"] = self.spi_baudrate
+            self.calibration.profile["baudrate_tuned"] = True
+            self.calibration.save()
+            self.rows_per_second = self.calibration.rows_per_second(
+                baudrate=self.spi_baudrate, batch_rows=self.v2_batch_rows
+            )
+
     def spi_deinit(self):
+        self.capture_stop()
+        if self.tune_state:
+            print("spi_tune: aborted.")
+            self.tune_state = None
+            self.dotstar.configure(baudrate=self.spi_baudrate)
         # https://github.com/adafruit/Adafruit_CircuitPython_DotStar/pull/65
         self.dotstar.unlock()
         self.dotstar.deinit()
@@ -338,39 +1315,15 @@ class POVPainter(ModeBaseClass):
         pixel_count = self.bmp2led.pixel_count
         begin = helper.limit(begin, 0, pixel_count - 1)
         end = helper.limit(end, 0, pixel_count - 1)
-        pixel_on_count = (end - begin) + 1
-        pixel_off_end_count = (pixel_count - 1) - end
-
-        off_pixel = [255, 0, 0, 0]
-        on_pixel = [255, 0, 0, 0]
-        on_pixel[1 + self.bmp2led.red_index] = r
-        on_pixel[1 + self.bmp2led.green_index] = g
-        on_pixel[1 + self.bmp2led.blue_index] = b
-
-        buffer = bytearray(
-            # header
-            [0] * 4
-            # pixel data
-            + off_pixel * begin
-            + on_pixel * pixel_on_count
-            + off_pixel * pixel_off_end_count
-            # + off_pixel
-            # tail
-            + [255] * ((pixel_count + 15) // 16)
-        )
-        self.dotstar.write(buffer)
+        self.dotstar.write(
+            self.control_frames.range(begin=begin, end=end, r=r, g=g, b=b)
+        )
 
     def clear_strip(self):
         """
         Turn off all LEDs of the DotStar strip.
         """
-        self.dotstar.write(
-            bytearray(
-                [0] * 4
-                + [255, 0, 0, 0] * self.bmp2led.pixel_count
-                + [255] * ((self.bmp2led.pixel_count + 15) // 16)
-            )
-        )
+        self.dotstar.write(self.control_frames.off)
 
     def load_progress(self, amount):
         """
@@ -380,8 +1333,7 @@ class POVPainter(ModeBaseClass):
         """
         # self.rect.x = int(board.DISPLAY.width * (amount - 1.0))
         # self.terminal_progressbar.update(amount)
-        num_on = int(amount * self.bmp2led.pixel_count + 0.5)
-        self.dotstar_set_pixel(begin=0, end=num_on, r=0, g=1, b=0)
+        self.dotstar.write(self.control_frames.progress(amount))
         # num_off = self.bmp2led.pixel_count - num_on
         # off_pixel = [255, 0, 0, 0]
         # on_pixel = [255, 0, 0, 0]
@@ -407,48 +1359,23 @@ class POVPainter(ModeBaseClass):
     # draw helper
 
     def paint_testpattern1(self, backwards=False):
-        c_on = int(helper.map_01_to(self.brightness, 0x00, 0xFF))
-        width = self.bmpHeight
-        bmp_range = range(width)
-        if backwards:
-            bmp_range = range(width - 1, -1, -1)
-        for col in bmp_range:
-            row = bytearray([0xFF, 0x01, 0x00, 0x00] * self.bmpHeight)
-            # if col == 0:
-            #     row = bytearray([0xFF, c_on, 0x00, 0x00] * self.bmpHeight)
-            # else:
-            # row = bytearray(self.bmpHeight * 4)
-
-            # paint a white diagonal line
-            # row[col*4:col*4+4] = bytearray([0xFF, c_on, 0x00, 0x00])
-            row[col * 4 : col * 4 + 4] = bytearray([0xFF, c_on, c_on, c_on])
-
-            # last led with color coded direction
-            # red forwards
-            row[-4:] = bytearray([0xFF, 0x00, 0x00, c_on])
-            if backwards:
-                # green backwards
-                row[-4:] = bytearray([0xFF, 0x00, c_on, 0x00])
-
-            self.dotstar.write(bytearray([0x00, 0x00, 0x00, 0x00]))
-            self.dotstar.write(row)
-            self.dotstar.write(bytearray([0x00, 0x00, 0x00, 0x00]))
-            time.sleep(self.pixel_delay)
-
-        # clear it out
-        self.dotstar.write(bytearray([0x00, 0x00, 0x00, 0x00]))
-        for r in range(self.bmpHeight * 5):
-            self.dotstar.write(bytearray([0xFF, 0x00, 0x00, 0x00]))
-        self.dotstar.write(bytearray([0xFF, 0xFF, 0xFF, 0xFF]))
-        gc.collect()
+        """direction marker pattern - rendered on the fly (no allocations)."""
+        if self.testpattern_store is None:
+            self.testpattern_store = self.pattern_store("direction")
+        self.testpattern_store.set_pixel_header(self.pixel_header)
+        self.paint_frames(self.testpattern_store, backwards)
 
     ##########################################
     # load and draw v1
 
-    # def load_image_v1_to_buffer(self, filename, self.image_buffer):
     def load_image_v1(self, filename=None):
         """
-        Load image into buffer.
+        Load image into a frame store.
+
+        the store is selected by `frame_store` config
+        (auto: frozen if available, RAM if the image fits, else flash file).
+        with `background_loading` the current image stays in use and
+        a RAM image is read in small slices from main_loop (see loading_step).
 
         Arguments:
             filename (string) : full filename (inkl. path) to load.
@@ -456,72 +1383,65 @@ class POVPainter(ModeBaseClass):
         if filename is None:
             filename = self.filename
         print("load_image_v1: \n" "    file: '{}'\n" "".format(filename))
+        self.loading_stop()
+        if self.load_generated(filename):
+            return
+        load_start = time.monotonic()
         try:
-            with open("/" + filename, "rb") as f:
-                print("File opened")
-                if f.read(2) != b"BM":  # check signature
-                    raise BMPError("Not BitMap file")
-
-                bmpFileSize = read_le(f.read(4))
-                f.read(4)  # Read & ignore creator bytes
-
-                bmpImageoffset = read_le(f.read(4))  # Start of image data
-                headerSize = read_le(f.read(4))
-                self.bmpWidth = read_le(f.read(4))
-                self.bmpHeight = read_le(f.read(4))
-                flip = True
-
-                print(
-                    "Size: %d\nImage offset: %d\nHeader size: %d"
-                    % (bmpFileSize, bmpImageoffset, headerSize)
+            store = self.frame_store_frozen(filename)
+            if store:
+                print("using frozen image.")
+                self.frame_store_set(store)
+                return
+            specs = self.bmp2led.specs(filename)
+            size = specs.width * self.bmp2led.column_frame_size(specs.height)
+            gc.collect()
+            mem_free = gc.mem_free() - self.frame_store_ram_reserve
+            current_size = self.frame_store.ram_size if self.frame_store else 0
+            use_ram = self.frame_store_kind == "ram" or (
+                self.frame_store_kind != "file"
+                and (size < mem_free + current_size or not self.fs_writeable)
+            )
+            if (
+                use_ram
+                and self.background_loading
+                and self.frame_store
+                and size < mem_free
+            ):
+                self.loading_start(filename)
+                return
+            # free the old image before allocating the new one.
+            self.image_free_v1()
+            if use_ram:
+                buffer, width, height = self.bmp2led.read_columns(
+                    filename,
+                    brightness=self.conversion_brightness,
+                    pixel_header=self.pixel_header,
+                    callback=self.load_progress,
                 )
-                print("Width: %d\nHeight: %d" % (self.bmpWidth, self.bmpHeight))
-
-                if read_le(f.read(2)) != 1:
-                    raise BMPError("Not singleplane")
-                bmpDepth = read_le(f.read(2))  # bits per pixel
-                print("Bit depth: %d" % (bmpDepth))
-                if bmpDepth != 24:
-                    raise BMPError("Not 24-bit")
-                if read_le(f.read(2)) != 0:
-                    raise BMPError("Compressed file")
-
-                print("Image OK!")
-
-                rowSize = (self.bmpWidth * 3 + 3) & ~3  # 32-bit line boundary
-
-                # its huge! but its also fast :)
-                self.image_buffer = bytearray(self.bmpWidth * self.bmpHeight * 4)
-                print("loading...\n")
-                # currently the ProgressBar crashes CP if not connected to the computer..
-                # no idea why.. so for now - just do not use it..
-                # maybe it is a memory overflow thing?!
-                # TODO: add issue
-                # self.terminal_progressbar = ProgressBar()
-                for row in range(self.bmpHeight):  # For each scanline...
-                    if flip:  # Bitmap is stored bottom-to-top order (normal BMP)
-                        pos = bmpImageoffset + (self.bmpHeight - 1 - row) * rowSize
-                    else:  # Bitmap is stored top-to-bottom
-                        pos = bmpImageoffset + row * rowSize
-
-                    # print ("seek to %d" % pos)
-                    f.seek(pos)
-                    for col in range(self.bmpWidth):
-                        b, g, r = bytearray(f.read(3))  # BMP files store RGB in BGR
-                        # front load brightness, gamma and reordering here!
-                        order = [b, g, r]
-                        idx = (col * self.bmpHeight + (self.bmpHeight - row - 1)) * 4
-                        self.image_buffer[idx] = 0xFF  # first byte is 'brightness'
-                        idx += 1
-                        for color in order:
-                            self.image_buffer[idx] = int(
-                                pow((color * self.brightness_mapped) / 255, 2.7) * 255
-                                + 0.5
-                                # pow((color * 1.0) / 255, 2.7) * 255 + 0.5
-                            )
-                            idx += 1
-                    self.load_progress(row / (self.bmpHeight - 1))
-
+                store = RAMFrameStore(
+                    buffer,
+                    frame_count=width,
+                    pixel_count=height,
+                    pixel_header=self.pixel_header,
+                )
+            else:
+                print("image does not fit into RAM - using flash file.")
+                width, height = self.bmp2led.write_columns(
+                    filename,
+                    self.frame_store_file,
+                    brightness=self.conversion_brightness,
+                    pixel_header=self.pixel_header,
+                    callback=self.load_progress,
+                )
+                store = FileFrameStore(
+                    self.frame_store_file,
+                    frame_count=width,
+                    pixel_count=height,
+                    pixel_header=self.pixel_header,
+                    page_frames=self.frame_store_page_frames,
+                )
+            self.frame_store_set(store)
         except OSError as e:
             if e.args[0] == 28:
                 raise OSError("OS Error 28 0.25")
@@ -529,41 +1449,607 @@ class POVPainter(ModeBaseClass):
                 raise OSError("OS Error 0.5")
         except BMPError as e:
             print("Failed to parse BMP: " + e.args[0])
+        except MemoryError:
+            print("TOO BIG")
+            self.dotstar_blink()
+        load_duration = time.monotonic() - load_start
 
         gc.collect()
         print(gc.mem_free())
         print("Ready to go!")
-        print("load_image_v1 " "('{}') " "done.\n" "".format(filename))
+        print(
+            "load_image_v1 "
+            "('{}') "
+            "done in {:.3f}s.\n"
+            "".format(filename, load_duration)
+        )
         self.clear_strip()
 
+    pattern_prefix = "pattern:"
+    text_prefix = "text:"
+
+    def image_filename(self, image):
+        """full filename of entry in self.images (patterns and texts have no path)."""
+        if image.startswith(self.pattern_prefix) or image.startswith(self.text_prefix):
+            return image
+        return self.path + "/" + image
+
+    def load_generated(self, filename):
+        """Load pattern, text or animation. Returns False for single images."""
+        if filename.startswith(self.pattern_prefix):
+            self.load_pattern(filename)
+            return True
+        if filename.startswith(self.text_prefix):
+            self.load_text(filename)
+            return True
+        if filename.rsplit("/", 1)[-1] in self.animations:
+            self.load_animation(filename)
+            return True
+        return False
+
+    @property
+    def pattern_value(self):
+        """full intensity (0..255) for patterns and texts."""
+        return int(255 * self.conversion_brightness**self.bmp2led.gamma + 0.5)
+
+    def pattern_store(self, name):
+        """GeneratorFrameStore for pattern `name` (see patterns.PATTERNS)."""
+        frame_count = self.config["POVPainter"]["pattern_columns"] or self.pixel_count
+        return GeneratorFrameStore(
+            PATTERNS[name](),
+            frame_count=frame_count,
+            pixel_count=self.pixel_count,
+            color_order=self.config["hw"]["pixel_color_order"],
+            pixel_header=self.pixel_header,
+            value=self.pattern_value,
+            budget_ns=int(self.config["POVPainter"]["pattern_budget"] * 1_000_000_000),
+        )
+
+    def load_pattern(self, filename):
+        """Use procedural pattern `pattern:<name>` as image (v1 and v2)."""
+        name = filename[len(self.pattern_prefix) :]
+        print("load pattern '{}'".format(name))
+        self.conversion_stop()
+        self.image_free_v1()
+        try:
+            self.frame_store_set(self.pattern_store(name))
+        except KeyError:
+            print("unknown pattern '{}'".format(name))
+        self.clear_strip()
+
+    def text_glyph_cache(self):
+        """GlyphCache of the text font - loaded on first use and then kept."""
+        if self.glyph_cache is None:
+            config = self.config["POVPainter"]
+            self.glyph_cache = pov_text.GlyphCache(
+                bitmap_font.load_font(config["text_font"]),
+                pixel_count=self.pixel_count,
+                color_order=self.config["hw"]["pixel_color_order"],
+                color=config["text_color"],
+                value=self.pattern_value,
+                pixel_header=self.pixel_header,
+                scale=config["text_scale"],
+            )
+        return self.glyph_cache
+
+    def text_format(self, template):
+        if "{clock}" in template:
+            return template.replace(
+                "{clock}",
+                pov_text.clock_text(self.config["POVPainter"]["text_clock_format"]),
+            )
+        return template
+
+    def load_text(self, filename):
+        """Use text `text:<text>` as image (v1 and v2)."""
+        self.text_template = filename[len(self.text_prefix) :]
+        print("load text '{}'".format(self.text_template))
+        self.conversion_stop()
+        self.image_free_v1()
+        try:
+            glyph_cache = self.text_glyph_cache()
+            glyph_cache.set_pixel_header(self.pixel_header)
+            store = TextFrameStore(
+                glyph_cache,
+                self.text_format(self.text_template),
+                column_repeat=self.config["POVPainter"]["text_column_repeat"],
+                padding=self.config["POVPainter"]["text_padding"],
+            )
+            store.set_value(self.pattern_value)
+            self.frame_store_set(store)
+        except (OSError, MemoryError) as error:
+            print("load text failed:", error)
+            self.text_template = None
+        self.clear_strip()
+
+    def text_update(self):
+        """Update text with clock - between strokes. (only new glyphs are rendered)"""
+        if not (
+            self.text_template
+            and isinstance(self.frame_store, TextFrameStore)
+            and "{clock}" in self.text_template
+        ):
+            return
+        now_ns = time.monotonic_ns()
+        if now_ns < self.text_clock_next_ns:
+            return
+        self.text_clock_next_ns = now_ns + self.text_clock_interval_ns
+        if self.frame_store.set_text(self.text_format(self.text_template)):
+            self.bmpWidth = self.frame_store.frame_count
+
+    def animation_index(self, filename):
+        """
+        Images of animation `filename`.
+
+        Returns:
+            tuple of list of BMP filenames (converted back to back),
+            index table (first column, column count) per image and height.
+        """
+        sprites = self.animations[filename.rsplit("/", 1)[-1]]
+        if sprites:
+            sources = [filename]
+        else:
+            sources = [
+                filename + "/" + entry
+                for entry in sorted(os.listdir(filename))
+                if entry.lower().endswith(".bmp")
+            ]
+        if not sources:
+            raise BMPError("animation without images")
+        index = []
+        height = None
+        column = 0
+        for source in sources:
+            specs = self.bmp2led.specs(source)
+            if height is None:
+                height = specs.height
+            elif specs.height != height:
+                raise BMPError("animation images need the same height")
+            if sprites:
+                width = specs.width // sprites
+                for image in range(sprites):
+                    index.append((column + width * image, width))
+            else:
+                index.append((column, specs.width))
+            column += specs.width
+        return sources, index, height
+
+    def animation_convert(self, sources, write, columns):
+        """Convert all columns of `sources` in chunks - `write(chunk)` each."""
+        done = 0
+        for source in sources:
+            width = self.bmp2led.specs(source).width
+            for column_start in range(0, width, self.animation_chunk_columns):
+                for _ in self.bmp2led.read_columns_iter(
+                    source,
+                    self.conversion_brightness,
+                    self.pixel_header,
+                    column_start,
+                    self.animation_chunk_columns,
+                ):
+                    pass
+                chunk, chunk_columns, _ = self.bmp2led.columns_result
+                self.bmp2led.columns_result = None
+                write(chunk)
+                done += chunk_columns
+                self.load_progress(done / columns)
+
+    animation_chunk_columns = 32
+
+    def load_animation(self, filename):
+        """
+        Convert all images of an animation into one frame store.
+
+        RAM if it fits (same rules as load_image_v1), otherwise flash file.
+        """
+        print("load animation '{}'".format(filename))
+        self.conversion_stop()
+        self.image_free_v1()
+        load_start = time.monotonic()
+        try:
+            sources, index, height = self.animation_index(filename)
+            columns = sum(self.bmp2led.specs(source).width for source in sources)
+            frame_size = self.bmp2led.column_frame_size(height)
+            gc.collect()
+            mem_free = gc.mem_free() - self.frame_store_ram_reserve
+            use_ram = self.frame_store_kind == "ram" or (
+                self.frame_store_kind != "file"
+                and (columns * frame_size < mem_free or not self.fs_writeable)
+            )
+            store = None
+            if use_ram:
+                try:
+                    buffer = bytearray(columns * frame_size)
+                    view = memoryview(buffer)
+                    offset = 0
+
+                    def write(chunk):
+                        nonlocal offset
+                        view[offset : offset + len(chunk)] = chunk
+                        offset += len(chunk)
+
+                    self.animation_convert(sources, write, columns)
+                    store = RAMFrameStore(
+                        buffer,
+                        frame_count=columns,
+                        pixel_count=height,
+                        pixel_header=self.pixel_header,
+                    )
+                except MemoryError:
+                    if not self.fs_writeable:
+                        raise
+                    buffer = None
+                    view = None
+                    gc.collect()
+            if store is None:
+                print("animation does not fit into RAM - using flash file.")
+                with open(self.frame_store_file, "wb") as output_file:
+                    self.animation_convert(sources, output_file.write, columns)
+                store = FileFrameStore(
+                    self.frame_store_file,
+                    frame_count=columns,
+                    pixel_count=height,
+                    pixel_header=self.pixel_header,
+                    page_frames=self.frame_store_page_frames,
+                )
+            self.frame_store_set(AnimationFrameStore(store, index))
+            print(
+                "load_animation: {} images in {:.3f}s."
+                "".format(len(index), time.monotonic() - load_start)
+            )
+        except (OSError, BMPError) as error:
+            print("load animation failed:", error)
+        except MemoryError:
+            print("TOO BIG")
+            self.dotstar_blink()
+        gc.collect()
+        self.clear_strip()
+
+    def frame_store_frozen(self, filename):
+        """FrozenFrameStore for image if it is frozen into the firmware."""
+        if self.frame_store_kind not in ("auto", "frozen"):
+            return None
+        try:
+            frozen_images = __import__(self.frozen_images_module)
+        except ImportError:
+            return None
+        entry = frozen_images.images.get(filename.rsplit("/", 1)[-1])
+        # only the pixel header is patched at paint time -
+        # baked brightness and HDR data have to match the conversion.
+        # (older modules without these fields: full scale, no HDR)
+        if (
+            entry is None
+            or entry["color_order"] != self.config["hw"]["pixel_color_order"]
+            or abs(entry["gamma"] - self.bmp2led.gamma) > 0.001
+            or abs(entry.get("brightness", 1.0) - self.conversion_brightness) > 0.001
+            or entry.get("hdr", False) != self.bmp2led.hdr
+        ):
+            return None
+        store = FrozenFrameStore(
+            entry["frames"], frame_count=entry["width"], pixel_count=entry["height"]
+        )
+        store.set_pixel_header(self.pixel_header)
+        return store
+
+    def image_free_v1(self):
+        self.pyramid_stop()
+        if self.frame_store:
+            self.frame_store.close()
+            self.frame_store = None
+        gc.collect()
+
+    def frame_store_set(self, store):
+        """Use new frame store - the old one is closed."""
+        self.pyramid_stop()
+        if self.frame_store:
+            self.frame_store.close()
+        store = self.pyramid_build(store)
+        self.frame_store = store
+        self.bmpWidth = store.frame_count
+        self.bmpHeight = store.pixel_count
+        print("Width: %d\nHeight: %d" % (self.bmpWidth, self.bmpHeight))
+
+    def loading_start(self, filename):
+        """Start reading image into a second buffer (double buffering)."""
+        self.loading = self.bmp2led.read_columns_iter(
+            filename,
+            brightness=self.conversion_brightness,
+            pixel_header=self.pixel_header,
+        )
+        self.loading_filename = filename
+        self.loading_pixel_header = self.pixel_header
+        self.loading_start_time = time.monotonic()
+
+    def loading_step(self):
+        """
+        Read next block of rows.
+
+        Returns True as long as the loading is running.
+        """
+        if not self.loading:
+            return False
+        try:
+            next(self.loading)
+            return True
+        except StopIteration:
+            self.loading = None
+            buffer, width, height = self.bmp2led.columns_result
+            store = RAMFrameStore(
+                buffer,
+                frame_count=width,
+                pixel_count=height,
+                pixel_header=self.loading_pixel_header,
+            )
+            # brightness changed while loading?
+            store.set_pixel_header(self.pixel_header)
+            # swap - all in one go between two strokes.
+            self.frame_store_set(store)
+            print(
+                "load_image_v1 "
+                "('{}') "
+                "done in background in {:.3f}s.\n"
+                "".format(
+                    self.loading_filename, time.monotonic() - self.loading_start_time
+                )
+            )
+        except MemoryError:
+            # no room for two images - free the current one and load blocking.
+            print("not enough memory for background loading.")
+            self.loading = None
+            self.image_free_v1()
+            self.load_image_v1(self.loading_filename)
+        except (BMPError, OSError) as error:
+            print("background loading failed:", error)
+            self.loading = None
+        gc.collect()
+        return False
+
+    def loading_stop(self):
+        """Abort running background loading. (the current image stays)"""
+        if self.loading:
+            self.loading.close()
+            self.loading = None
+
+    def pyramid_build(self, store):
+        """
+        PyramidFrameStore with `pyramid_levels` lower resolutions of `store`.
+
+        all levels start as StrideFrameStore (no extra RAM).
+        for RAM images the averaged levels are built by `pyramid_step`
+        in the background - as long as they fit above frame_store_ram_reserve.
+        """
+        config = self.config["POVPainter"]
+        if not isinstance(store, (RAMFrameStore, FileFrameStore, FrozenFrameStore)):
+            return store
+        levels = [store]
+        for _ in range(config["pyramid_levels"]):
+            if levels[-1].frame_count // 2 < config["pyramid_min_columns"]:
+                break
+            levels.append(StrideFrameStore(store, 2 ** len(levels)))
+        if len(levels) == 1:
+            return store
+        print("pyramid: columns", [level.frame_count for level in levels])
+        pyramid = PyramidFrameStore(levels)
+        if isinstance(store, RAMFrameStore):
+            self.pyramid_building = self.pyramid_build_iter(pyramid)
+        return pyramid
+
+    def pyramid_build_iter(self, pyramid):
+        """Replace the stride levels of `pyramid` by averaged RAM levels."""
+        source = pyramid.levels[0]
+        for level in range(1, len(pyramid.levels)):
+            count = source.frame_count // 2
+            size = count * source.frame_size
+            gc.collect()
+            if gc.mem_free() - self.frame_store_ram_reserve < size:
+                print("pyramid: no RAM for level {} - skip columns.".format(level))
+                return
+            try:
+                buffer = bytearray(size)
+            except MemoryError:
+                print("pyramid: no RAM for level {} - skip columns.".format(level))
+                return
+            yield from BMP2LED.halve_columns_iter(
+                source.buffer, source.pixel_count, buffer
+            )
+            source = RAMFrameStore(
+                buffer,
+                frame_count=count,
+                pixel_count=source.pixel_count,
+                pixel_header=source.pixel_header,
+            )
+            # brightness changed while building?
+            source.set_pixel_header(pyramid.pixel_header)
+            pyramid.levels[level] = source
+            if pyramid.level == level:
+                pyramid.select(level)
+                self.bmpWidth = pyramid.frame_count
+
+    def pyramid_step(self):
+        """
+        Build the next block of a pyramid level.
+
+        Returns True as long as the building is running.
+        """
+        if not self.pyramid_building:
+            return False
+        try:
+            next(self.pyramid_building)
+            return True
+        except StopIteration:
+            self.pyramid_building = None
+        gc.collect()
+        return False
+
+    def pyramid_stop(self):
+        """Abort building pyramid levels. (the stride levels stay)"""
+        if self.pyramid_building:
+            self.pyramid_building.close()
+            self.pyramid_building = None
+
+    def column_rate_max(self):
+        """columns per second the spi bus can deliver."""
+        if self.calibration.profile:
+            spi_time = self.calibration.spi_time(self.spi_baudrate)
+        else:
+            frame_bits = BMP2LED.column_frame_size(self.pixel_count) * 8
+            spi_time = frame_bits / self.spi_baudrate
+        return 1 / spi_time
+
+    def pyramid_select(self, duration=None):
+        """
+        Select the largest pyramid level that fits into a stroke.
+
+        Arguments:
+            duration (float) : stroke duration in seconds. (None: full image)
+        """
+        store = self.frame_store
+        if not isinstance(store, PyramidFrameStore):
+            return
+        level = 0
+        if duration:
+            rate_max = (
+                self.column_rate_max() * self.config["POVPainter"]["pyramid_rate_margin"]
+            )
+            if self.timing_profile == "sine" and self.stroke_duration:
+                # the middle columns come faster than the average -
+                # the shortest interval of the schedule has to fit.
+                def fits(columns):
+                    interval = stroke_timing.interval_min_sine(
+                        columns, self.stroke_duration, stroke_fill=self.stroke_fill
+                    )
+                    return interval * rate_max >= 1
+
+            else:
+                columns_max = (duration - self.paint_latency_max) * rate_max
+
+                def fits(columns):
+                    return columns <= columns_max
+
+            while level < len(store.levels) - 1 and not fits(
+                store.levels[level].frame_count
+            ):
+                level += 1
+        if level != store.level:
+            store.select(level)
+            self.bmpWidth = store.frame_count
+
+    def column_schedule(self, num_columns, *, backwards=False, period=None):
+        """
+        Get emission schedule for the next stroke (see stroke_timing).
+
+        Arguments:
+            num_columns (int) : columns to paint.
+            backwards (bool) : stroke direction (latency compensation).
+            period (float) : linear column period in seconds
+                (None: pixel_delay).
+        Returns: list of `num_columns + 1` offsets in ns from stroke start.
+        """
+        latency = self.paint_latency[backwards]
+        if period is None:
+            period = self.pixel_delay
+        if self.timing_profile == "sine" and self.stroke_duration:
+            key = ("sine", num_columns, self.stroke_duration, latency)
+        else:
+            key = ("linear", num_columns, period, latency)
+        cached_key, schedule = self._schedules[backwards]
+        if key == cached_key:
+            return schedule
+        if key[0] == "sine":
+            schedule = stroke_timing.schedule_sine(
+                num_columns,
+                self.stroke_duration,
+                stroke_fill=self.stroke_fill,
+                latency=latency,
+            )
+        else:
+            # pad the faster direction - so both images start at the same place
+            schedule = stroke_timing.schedule_linear(
+                num_columns,
+                period * num_columns,
+                delay=self.paint_latency_max - latency,
+            )
+        self._schedules[backwards] = (key, schedule)
+        return schedule
+
+    def paint_aborted(self):
+        # the strip is cleared by the caller.
+        self.paint_aborts += 1
+
     def paint_v1(self, backwards=False):
         # print("Draw!")
-        index = 0
-        bmp_range = range(self.bmpWidth)
-        if backwards:
-            bmp_range = range(self.bmpWidth - 1, -1, -1)
-        for col in bmp_range:
-            row = self.image_buffer[index : index + self.bmpHeight * 4]
-
-            # debug output
-            # overwrite last led with color coded direction
-            # red forwards
-            # row[-4:] = bytearray([0xFF, 0x00, 0x00, 0x01])
-            # if backwards:
-            #     # green backwards
-            #     row[-4:] = bytearray([0xFF, 0x00, 0x01, 0x00])
-
-            self.dotstar.write(bytearray([0x00, 0x00, 0x00, 0x00]))
-            self.dotstar.write(row)
-            self.dotstar.write(bytearray([0x00, 0x00, 0x00, 0x00]))
-            index += self.bmpHeight * 4
-            time.sleep(self.pixel_delay)
+        self.paint_frames(self.frame_store, backwards)
+        if self.frame_store:
+            # next animation image
+            self.frame_store.advance()
+            self.bmpWidth = self.frame_store.frame_count
+
+    def paint_frames(self, store, backwards=False):
+        """Paint all frames of a FrameStore on the column schedule."""
+        if store is None:
+            return
+        count = len(store)
+        store.prepare(backwards)
+        frame = store.frame
+        # prepared before the stroke - the loop only does lookups.
+        schedule = self.column_schedule(count, backwards=backwards)
+        busy_wait_ns = self.busy_wait_ns
+        overruns = 0
+        overrun_max_ns = 0
+        # column emission times (us) - None if the statistics are disabled
+        ring = None
+        if self.paint_stats:
+            ring = self.paint_stats.ring
+            ring_size = self.paint_stats.size
+        # During painting, automatic garbage collection is disabled
+        # so there are no pauses in the LED output.
+        # every column is one frame (inkl. start & end frame)
+        # → one write per column.
+        # (the nanosecond timestamps are long ints - these small allocations
+        # are fine as long as gc stays disabled for the stroke.)
+        events = self.input_events
+        painted = count
+        gc.collect()
+        gc.disable()
+        stroke_start_ns = time.monotonic_ns()
+        for index in range(count):
+            # input check once per column - also when running late.
+            if events is not None and len(events):
+                painted = index
+                break
+            # absolute deadline → no drift with write duration.
+            deadline_ns = stroke_start_ns + schedule[index]
+            slack_ns = deadline_ns - time.monotonic_ns()
+            if slack_ns < 0:
+                # late - do not wait and catch up with the next columns.
+                overruns += 1
+                if -slack_ns > overrun_max_ns:
+                    overrun_max_ns = -slack_ns
+            else:
+                if slack_ns > busy_wait_ns:
+                    time.sleep((slack_ns - busy_wait_ns) / 1_000_000_000)
+                while time.monotonic_ns() < deadline_ns:
+                    pass
+            if ring is not None:
+                ring[index % ring_size] = (
+                    time.monotonic_ns() - stroke_start_ns
+                ) // 1000
+            self.dotstar.write(frame(index))
+        else:
+            # show the last column for its full period
+            deadline_ns = stroke_start_ns + schedule[count]
+            while time.monotonic_ns() < deadline_ns:
+                pass
+        gc.enable()
+        self.paint_overruns = overruns
+        self.paint_overrun_max_ns = overrun_max_ns
+        if painted < count:
+            self.paint_aborted()
+        if ring is not None:
+            self.paint_stats.stroke_done(painted, schedule)
 
         # clear it out
-        self.dotstar.write(bytearray([0x00, 0x00, 0x00, 0x00]))
-        for r in range(self.bmpHeight * 5):
-            self.dotstar.write(bytearray([0xFF, 0x00, 0x00, 0x00]))
-        self.dotstar.write(bytearray([0xFF, 0xFF, 0xFF, 0xFF]))
+        self.clear_strip()
         gc.collect()
 
     ##########################################
@@ -577,17 +2063,17 @@ class POVPainter(ModeBaseClass):
 
         # Generate a small temporary file equal to one full LED row,
         # all set 'off'.
-        row_data = bytearray(
-            [0] * 4
-            + [255, 0, 0, 0] * self.bmp2led.pixel_count
-            + [255] * ((self.bmp2led.pixel_count + 15) // 16)
-        )
+        row_data = frame_off(self.bmp2led.pixel_count)
         row_size = len(row_data)
+        if not self.v2_batch_rows:
+            self.v2_batch_rows = self.v2_batch_rows_tune()
 
         if self.fs_writeable:
             try:
                 with open(self.led_data_file_benchmark, "wb") as file:
-                    file.write(row_data)
+                    # one batch - as paint_v2 reads it
+                    for _ in range(self.v2_batch_rows):
+                        file.write(row_data)
             except OSError as error:
                 if error.errno == 30:
                     # Read-only filesystem
@@ -595,53 +2081,113 @@ class POVPainter(ModeBaseClass):
                 else:
                     raise error
 
-        # For a period of 1 second, repeatedly seek to start of file,
-        # read row of data and write to LED strip as fast as possible.
+        # For a period of 1 second, repeatedly read the batch of rows
+        # (same reader as paint_v2) and write to LED strip as fast as possible.
         # Not super precise, but good-enough guess of light painting speed.
         # (Bonus, this will turn off LED strip on startup).
         rows = 0
-        with open(self.led_data_file_benchmark, "rb") as file:
-            start_time = time.monotonic()
-            while time.monotonic() - start_time < 1.0:
-                file.seek(0)
-                file.readinto(row_data)
-                self.dotstar.write(row_data)
+        store = FileFrameStore(
+            self.led_data_file_benchmark,
+            frame_count=self.v2_batch_rows,
+            pixel_count=self.bmp2led.pixel_count,
+            page_frames=self.v2_batch_rows,
+            frame_size=row_size,
+        )
+        start_time = time.monotonic()
+        while time.monotonic() - start_time < 1.0:
+            # force a read of the page - like playing a long file
+            store.set_pixel_header(store.pixel_header)
+            for index in range(store.frame_count):
+                self.dotstar.write(store.frame(index))
                 time.sleep(0.001)  # See notes in paint()
                 rows += 1
+        store.close()
 
         return rows, row_size
 
     def load_image_v2(self, filename=None):
-        if filename is None:
-            filename = self.filename
         """
-        Load BMP from image list, determined by variable self.image_num
-        (not a passed argument). Data is converted and placed in
-        self.tempfile.
+        Load BMP `filename` (default: self.filename - or a pattern / text).
+        Data is converted and placed in
+        the led_cache (or self.tempfile if the cache is disabled).
         """
         print("loading...\n")
+        self.conversion_stop()
 
-        if self.fs_writeable:
-            # pylint: disable=eval-used
-            # (It's cool, is a 'trusted string' in the code / config)
-            # Playback time in seconds
-            # duration = eval(self.times[self.time])
+        # pylint: disable=eval-used
+        # (It's cool, is a 'trusted string' in the code / config)
+        # Playback time in seconds
+        # duration = eval(self.times[self.time])
 
-            # The 0.9 here is an empirical guesstimate; playback is ever-so-
-            # slightly slower than benchmark speed due to button testing.
-            # rows = int(duration * self.rows_per_second * 0.9 + 0.5)
-            rows = int(self.draw_duration * self.rows_per_second * 0.9 + 0.5)
+        # The 0.9 here is an empirical guesstimate; playback is ever-so-
+        # slightly slower than benchmark speed due to button testing.
+        # rows = int(duration * self.rows_per_second * 0.9 + 0.5)
+        rows = int(self.draw_duration * self.rows_per_second * 0.9 + 0.5)
 
-            image_filename = self.path + "/" + self.images[self.image_num]
+        if filename is None:
+            filename = self.filename
+        if self.load_generated(filename):
+            return
+        # back to file playback
+        self.image_free_v1()
+        image_filename = filename
+
+        cache_key = None
+        if self.led_cache:
+            cache_key = self.led_cache.key(
+                image_filename,
+                brightness=self.conversion_brightness,
+                gamma=self.bmp2led.gamma,
+                rows=rows,
+                color_order=self.config["hw"]["pixel_color_order"],
+                loop=self.loop,
+                hdr=self.bmp2led.hdr,
+            )
+            cached = self.led_cache.lookup(cache_key)
+            if cached:
+                self.led_data_file, self.num_rows = cached
+                self.off_row = not self.loop
+                print("using cached '{}'".format(self.led_data_file))
+                return
+
+        if self.fs_writeable:
+            output_filename = self.tempfile
+            if self.led_cache:
+                output_filename = self.led_cache.filename_for(cache_key)
+                # +1 row for the 'off' row at the end
+                # (the file that is painted during background loading stays)
+                self.led_cache.make_room(
+                    self.bmp2led.dotstar_row_size * (rows + 1),
+                    self.bmp2led.bytes_free,
+                    exclude=self.led_cache.key_for_file(self.led_data_file),
+                )
+            if self.stream_conversion or self.background_loading:
+                if not self.stream_conversion and output_filename == self.led_data_file:
+                    # double buffer - do not overwrite the file we are painting.
+                    output_filename = self.tempfile_alt
+                self.conversion_start(
+                    image_filename,
+                    output_filename,
+                    rows,
+                    cache_key,
+                    streaming=self.stream_conversion,
+                )
+                return
             try:
-                self.num_rows = self.bmp2led.process(
+                num_rows = self.bmp2led.process(
                     image_filename,
-                    self.tempfile,
+                    output_filename,
                     rows,
-                    self.brightness_mapped,
+                    self.conversion_brightness,
                     self.loop,
                     self.load_progress,
                 )
+                if num_rows:
+                    self.led_data_file = output_filename
+                    self.num_rows = num_rows
+                    self.off_row = not self.loop
+                    if self.led_cache:
+                        self.led_cache.add(cache_key, output_filename, num_rows)
             except (MemoryError, BMPError):
                 print("TOO BIG")
                 self.dotstar_blink()
@@ -653,29 +2199,196 @@ class POVPainter(ModeBaseClass):
             print("filesystem ReadOnly. we can only use old led_data files..")
             self.dotstar_blink(blink_count=5, duration=1, r=1, g=0, b=1)
 
-    def paint_v2(self):
+    def conversion_start(
+        self, image_filename, output_filename, rows, cache_key, *, streaming=True
+    ):
         """
-        Paint Image once.
+        Start background conversion.
+
+        main_loop converts the image block by block.
+        streaming: paint_v2 plays the rows that are done.
+        otherwise: paint_v2 plays the current image until the
+        conversion is complete (double buffering).
+        """
+        self.conversion_stop()
+        self.conversion = self.bmp2led.process_iter(
+            image_filename,
+            output_filename,
+            rows,
+            self.conversion_brightness,
+            self.loop,
+        )
+        self.conversion_cache_key = cache_key
+        self.conversion_output = output_filename
+        self.conversion_streaming = streaming
+        if streaming:
+            self.led_data_file = output_filename
+            self.num_rows = rows
+            self.off_row = False
+            # convert first block - so the next stroke has something to show.
+            self.conversion_step()
+
+    def conversion_step(self):
+        """
+        Convert next block of rows.
+
+        Returns True as long as the conversion is running.
         """
+        if not self.conversion:
+            return False
+        try:
+            next(self.conversion)
+            return True
+        except StopIteration:
+            self.conversion_finish()
+        except (MemoryError, BMPError, OSError) as error:
+            print("conversion failed:", error)
+            self.conversion = None
+            if self.conversion_streaming:
+                self.num_rows = self.bmp2led.rows_done
+                self.off_row = False
+            self.dotstar_blink()
+        return False
+
+    def conversion_finish(self):
+        self.conversion = None
+        num_rows = self.bmp2led.rows_total
+        if num_rows:
+            # swap (double buffering) - or just the final row count (streaming)
+            self.led_data_file = self.conversion_output
+            self.num_rows = num_rows
+            self.off_row = not self.loop
+            if self.led_cache:
+                self.led_cache.add(self.conversion_cache_key, self.led_data_file, num_rows)
+        print("conversion done.")
+        gc.collect()
+
+    def conversion_stop(self):
+        """Abort running conversion. (the unfinished file is not cached)"""
+        if self.conversion:
+            self.conversion.close()
+            self.conversion = None
+
+    def v2_batch_rows_tune(self):
+        """
+        Rows per readinto() for paint_v2.
+
+        reads whole FAT clusters and at least `v2_read_size_min` bytes -
+        per call overhead of the filesystem is spread over several rows.
+        """
+        try:
+            cluster_size = self.bmp2led.cluster_size(self.tempfile)
+        except OSError:
+            cluster_size = 512
+        clusters = max(
+            1, -(-self.config["POVPainter"]["v2_read_size_min"] // cluster_size)
+        )
+        batch_rows = max(1, clusters * cluster_size // self.bmp2led.dotstar_row_size)
+        print(
+            "v2 bulk read: cluster size {} → {} rows per read".format(
+                cluster_size, batch_rows
+            )
+        )
+        return batch_rows
 
-        painting = True
-        row = 0
+    def paint_v2(self, backwards=False):
+        """
+        Paint Image once.
+        """
+        if self.frame_store:
+            # pattern - no led data file
+            self.paint_v1(backwards)
+            return
+
+        rows_available = self.num_rows
+        if backwards and self.off_row:
+            # the 'all off' row ends the forward stroke -
+            # backwards it would be played first and shift the image by a row.
+            # (the strip is cleared after the stroke anyway)
+            rows_available -= 1
+        if self.conversion and self.conversion_streaming:
+            # only play the rows the converter has finished.
+            # process_iter flushes every block before it moves rows_done -
+            # so all reads of this stroke stay in data that is on the disk.
+            # (FAT only updates size and sectors for other handles on flush)
+            rows_available = self.bmp2led.rows_done
+        if rows_available <= 0:
+            return
+
+        # every row gets an absolute deadline (as in paint_frames) -
+        # the batched reads must not bunch the rows into bursts.
+        # sine profile: placed on the sine schedule.
+        # linear: the file rows spread over the stroke
+        # (unknown stroke: over draw_duration - the time the rows were made for)
+        # the faster direction is padded - as for paint_v1 both directions
+        # start the image at the same place.
+        if self.stroke_time:
+            period = (self.stroke_time - self.paint_latency_max) / self.num_rows
+        else:
+            period = self.draw_duration / self.num_rows
+        schedule = self.column_schedule(
+            rows_available, backwards=backwards, period=period
+        )
 
-        with open(self.tempfile, "rb") as file:
-            led_buffer = bytearray(self.row_size)
+        # rows are read in batches of v2_batch_rows with one readinto()
+        # into a preallocated page - and handed out as memoryview slices.
+        # (opened per stroke - the streaming conversion appends to the file.
+        # a fresh handle has no sectors cached from before the last flush.)
+        store = FileFrameStore(
+            self.led_data_file,
+            frame_count=rows_available,
+            pixel_count=self.pixel_count,
+            page_frames=self.v2_batch_rows,
+            frame_size=self.row_size,
+            page=self.v2_page,
+        )
+        self.v2_page = store.page
+        # the global brightness is patched per page
+        # (HDR: pixel_header stays 0xFF → the stored levels are kept)
+        store.set_pixel_header(self.pixel_header)
+        store.prepare(backwards)
+        frame = store.frame
+        ring = None
+        if self.paint_stats:
+            ring = self.paint_stats.ring
+            ring_size = self.paint_stats.size
+        busy_wait_ns = self.busy_wait_ns
+        overruns = 0
+        overrun_max_ns = 0
+        events = self.input_events
+        painted = rows_available
+        try:
             # During painting, automatic garbage collection is disabled
             # so there are no pauses in the LED output (which would wreck
             # the photo). This requires that the loop below is written in
             # such a way to avoid ANY allocations within that scope!
             gc.collect()
             gc.disable()
-
-            while painting:
-                file.seek(row * self.row_size)
-                # using readinto() instead of read() is another
-                # avoid-automatic-garbage-collection strategy.
-                file.readinto(led_buffer)
-                self.dotstar.write(led_buffer)
+            stroke_start_ns = time.monotonic_ns()
+
+            for row in range(rows_available):
+                if events is not None and len(events):
+                    painted = row
+                    break
+                # a page read happens here - before the deadline check.
+                led_row = frame(row)
+                deadline_ns = stroke_start_ns + schedule[row]
+                slack_ns = deadline_ns - time.monotonic_ns()
+                if slack_ns < 0:
+                    # late - do not wait and catch up with the next rows.
+                    overruns += 1
+                    if -slack_ns > overrun_max_ns:
+                        overrun_max_ns = -slack_ns
+                else:
+                    if slack_ns > busy_wait_ns:
+                        time.sleep((slack_ns - busy_wait_ns) / 1_000_000_000)
+                    while time.monotonic_ns() < deadline_ns:
+                        pass
+                if ring is not None:
+                    ring[row % ring_size] = (
+                        time.monotonic_ns() - stroke_start_ns
+                    ) // 1000
+                self.dotstar.write(led_row)
                 # Strip updates are more than fast enough...
                 # it's the file conversion that takes forever.
                 # This small delay (also present in the benchmark()
@@ -684,14 +2397,19 @@ class POVPainter(ModeBaseClass):
                 # time.sleep(0.001)
                 # TODO Stefan: check this mode!
                 # maybe this is not true for pov application?
-                row += 1
-                if row >= self.num_rows:
-                    painting = False
 
+        finally:
             # Re-enable automatic garbage collection
             gc.enable()
+            store.close()
+        self.paint_overruns = overruns
+        self.paint_overrun_max_ns = overrun_max_ns
+        if painted < rows_available:
+            self.paint_aborted()
+        if ring is not None:
+            self.paint_stats.stroke_done(painted, schedule)
 
-            self.clear_strip()
+        self.clear_strip()
 
     ##########################################
     # V3 dotstar_image_pov.py
@@ -701,19 +2419,38 @@ class POVPainter(ModeBaseClass):
     # ui
 
     def handle_paintrequest_do_paint(self, *, backwards=False):
+        if self.capture:
+            self.capture.mark(backwards, self.stroke_duration)
         paint_start = time.monotonic()
         # time.sleep(0.09)
         self.paint(backwards=backwards)
         # self.paint_testpattern1(backwards=backwards)
         paint_end = time.monotonic()
         self.paint_duration = paint_end - paint_start
+        if self.capture:
+            self.capture_strokes -= 1
+            if self.capture_strokes <= 0 or self.capture.full:
+                self.capture_stop()
         # print("paint {:>4.0f}ms".format(self.paint_duration*1000))
 
     def handle_paintrequest(self, event):
+        if self.tune_state:
+            # keep the test frame on the strip
+            return
         direction = event.direction
         if event.durations.backward_avg.stable and event.durations.forward_avg.stable:
             duration = event.durations.current_stroke
-            self.pixel_delay_raw = (duration - 0.004) / self.bmpWidth
+            self.stroke_time = duration
+            # averaged duration of this stroke direction for the sine profile
+            if direction == +1:
+                self.stroke_duration = event.durations.forward_avg.average
+            else:
+                self.stroke_duration = event.durations.backward_avg.average
+            # fewer columns if the spi bus can not deliver all in time
+            self.pyramid_select(duration)
+            # column period - paint_v1 schedules every column at an absolute
+            # deadline. so this maps the stroke duration onto the image width.
+            self.pixel_delay_raw = (duration - self.paint_latency_max) / self.bmpWidth
             if self.pixel_delay_raw < self.pixel_delay_max:
                 self.pixel_delay = self.pixel_delay_raw
             # print(
@@ -729,14 +2466,18 @@ class POVPainter(ModeBaseClass):
         else:
             # reset timing
             self.pixel_delay = 0.0014
+            self.stroke_duration = None
+            self.stroke_time = None
+            self.pyramid_select()
 
         if direction == +1:
             self.handle_paintrequest_do_paint(backwards=False)
-        # elif direction == -1:
-        #     self.handle_paintrequest_do_paint(backwards=True)
+        elif direction == -1:
+            self.handle_paintrequest_do_paint(backwards=True)
 
     def handle_user_input_touch(self, event):
         if event.touch.rose:
+            touch_id = event.touch_id
             if touch_id == 0:
                 self.switch_image()
             elif touch_id == 1:
@@ -755,6 +2496,84 @@ class POVPainter(ModeBaseClass):
             elif event.key_number == 3:
                 self.switch_image()
 
+    def capture_start(self, strokes=2):
+        """Record the SPI stream of the next strokes (see spi_capture.py)."""
+        if self.capture:
+            return
+        self.capture = SPICapture(
+            self.dotstar, max_bytes=self.config["POVPainter"]["spi_capture_max_bytes"]
+        )
+        self.capture_strokes = strokes
+        self.dotstar = self.capture
+        print("capture: recording the next {} strokes.".format(strokes))
+
+    def capture_stop(self):
+        """Stop recording and save the capture file."""
+        if not self.capture:
+            return
+        capture = self.capture
+        self.capture = None
+        self.dotstar = capture.spi
+        try:
+            capture.save(self.config["POVPainter"]["spi_capture_file"])
+        except OSError as error:
+            print("capture: could not save ({}).".format(error))
+
+    def handle_command(self, input_string):
+        if self.tune_state:
+            # spi_tune waits for an answer
+            self.spi_tune_answer(input_string)
+            return True
+        if input_string.startswith("stats"):
+            if input_string.startswith("stats off"):
+                self.paint_stats = None
+                print("stats: off")
+            elif input_string.startswith("stats reset") and self.paint_stats:
+                self.paint_stats.reset()
+                print("stats: reset")
+            elif self.paint_stats is None:
+                self.paint_stats = PaintStats(
+                    self.config["POVPainter"]["paint_stats_size"]
+                )
+                print("stats: on - paint some strokes.")
+            else:
+                print(self.paint_stats)
+            return True
+        if input_string.startswith("capture"):
+            if not self.spi_init_done:
+                print("capture: POVPainter not active.")
+                return True
+            if not self.fs_writeable:
+                print("capture: filesystem is read-only - capture can not be saved.")
+                return True
+            try:
+                strokes = int(input_string[len("capture") :] or 2)
+            except ValueError:
+                print("capture: use 'capture [strokes]'")
+                return True
+            self.capture_start(strokes)
+            return True
+        if input_string.startswith("calibrate"):
+            if not self.spi_init_done:
+                print("calibrate: POVPainter not active.")
+                return True
+            self.calibration_load(force=True)
+            self.clear_strip()
+            print(
+                "rows_per_second: {}, row_size: {}".format(
+                    self.rows_per_second,
+                    self.row_size,
+                )
+            )
+            return True
+        if input_string.startswith("tune"):
+            if not self.spi_init_done:
+                print("tune: POVPainter not active.")
+                return True
+            self.spi_tune()
+            return True
+        return False
+
     def handle_gesture(self, event):
         if event.gesture == DIRECTION_CHANGED:
             if event.orig_event.instance.axis_name == "y":
@@ -777,7 +2596,7 @@ class POVPainter(ModeBaseClass):
         if self.image_num >= len(self.images):
             self.image_num = 0
 
-        self.filename = self.path + "/" + self.images[self.image_num]
+        self.filename = self.image_filename(self.images[self.image_num])
 
         self.load_image(self.filename)
 
@@ -786,6 +2605,9 @@ class POVPainter(ModeBaseClass):
         "paint: {paint_duration:>4.0f}ms "
         "pixel delay: {pixel_delay:>5.2f}ms "
         "({pixel_delay_raw:>5.2f}ms) "
+        "overrun: {paint_overruns:>3} ({paint_overrun_max:>5.2f}ms) "
+        "aborts: {paint_aborts:>3} "
+        "{paint_stats}"
     )
 
     def statusline_fn(self):
@@ -801,6 +2623,10 @@ class POVPainter(ModeBaseClass):
             paint_duration=self.paint_duration * 1000,
             pixel_delay=self.pixel_delay * 1000,
             pixel_delay_raw=self.pixel_delay_raw * 1000,
+            paint_overruns=self.paint_overruns,
+            paint_overrun_max=self.paint_overrun_max_ns / 1_000_000,
+            paint_aborts=self.paint_aborts,
+            paint_stats=self.paint_stats.statusline() if self.paint_stats else "",
         )
 
         return statusline
@@ -808,8 +2634,23 @@ class POVPainter(ModeBaseClass):
     ##########################################
     # main handling
 
+    def background_step(self):
+        """
+        Continue background loading / conversion / pyramid levels
+        for max `loading_slice`.
+
+        Returns True as long as there is work left.
+        """
+        slice_start_ns = time.monotonic_ns()
+        while self.loading_step() or self.conversion_step() or self.pyramid_step():
+            if time.monotonic_ns() - slice_start_ns > self.loading_slice_ns:
+                return True
+        return False
+
     def main_loop(self):
-        gc.collect()
+        self.text_update()
+        if not self.background_step():
+            gc.collect()
         # accel_y = self.accel_sensor.acceleration[1]
         # accel_x, accel_y, accel_z = self.accel_sensor.acceleration
         # if accel_y > 15:
@@ -851,19 +2692,5 @@ class POVPainter(ModeBaseClass):
 ##########################################
 
 
-def read_le(s):
-    # as of this writing, int.from_bytes does not have LE support, DIY!
-    result = 0
-    shift = 0
-    for byte in bytearray(s):
-        result += byte << shift
-        shift += 8
-    return result
-
-
-class BMPError(Exception):
-    pass
-
-
 if __name__ == "__main__":
     print("povpainter.py direct mode.")
@@ -0,0 +1,83 @@
+# SPDX-FileCopyrightText: 2024 Stefan Krüger s-light.eu
+# SPDX-License-Identifier: MIT
+# source https://github.com/s-light/cp_magic_painter/
+
+
+"""
+Capture the SPI stream of the strip - for the host side POV simulator
+(tools/pov_simulate.py).
+
+`SPICapture` wraps the (locked) busio.SPI of the strip: every `write` is
+passed on and recorded with its time stamp. strokes are marked with `mark`.
+recording copies every buffer - so it changes the timing slightly.
+only use it for debugging / measuring.
+
+file format (all little endian):
+    magic b"POVSPI1\\n"
+    records: type (uint8), time stamp in ns (uint64), length (uint32), data
+    type 0: write - data are the bytes written.
+    type 1: stroke start forward, type 2: stroke start backward -
+        data: expected stroke duration in us (uint32, 0 = unknown).
+"""
+
+import struct
+import time
+
+MAGIC = b"POVSPI1\n"
+RECORD_HEADER = "<BQI"
+RECORD_WRITE = 0
+RECORD_STROKE_FORWARD = 1
+RECORD_STROKE_BACKWARD = 2
+
+
+class SPICapture(object):
+    """Records all writes to `spi`. (everything else is passed on)"""
+
+    def __init__(self, spi, *, max_bytes=128 * 1024):
+        self.spi = spi
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.records = []
+
+    def __getattr__(self, name):
+        return getattr(self.spi, name)
+
+    @property
+    def full(self):
+        return self.size >= self.max_bytes
+
+    def record(self, record_type, data):
+        if self.size + len(data) > self.max_bytes:
+            self.size = self.max_bytes
+            return
+        self.size += len(data)
+        self.records.append((record_type, time.monotonic_ns(), data))
+
+    def write(self, buffer, *, start=0, end=None):
+        if end is None:
+            end = len(buffer)
+        self.spi.write(buffer, start=start, end=end)
+        self.record(RECORD_WRITE, bytes(buffer[start:end]))
+
+    def mark(self, backwards=False, stroke_duration=None):
+        """Stroke starts now. (stroke_duration in seconds if known)"""
+        duration_us = int((stroke_duration or 0) * 1_000_000)
+        self.record(
+            RECORD_STROKE_BACKWARD if backwards else RECORD_STROKE_FORWARD,
+            struct.pack("<I", duration_us),
+        )
+
+    def save(self, filename):
+        """Write all records to `filename` and start again."""
+        with open(filename, "wb") as file:
+            file.write(MAGIC)
+            for record_type, timestamp, data in self.records:
+                header = struct.pack(RECORD_HEADER, record_type, timestamp, len(data))
+                file.write(header)
+                file.write(data)
+        print(
+            "SPICapture: {} records ({} bytes) saved to '{}'."
+            "".format(len(self.records), self.size, filename)
+        )
+        self.records = []
+        self.size = 0
@@ -0,0 +1,100 @@
+# SPDX-FileCopyrightText: 2024 Stefan Krüger s-light.eu
+# SPDX-License-Identifier: MIT
+# source https://github.com/s-light/cp_magic_painter/
+
+
+"""
+Column emission schedules for POV strokes.
+
+A schedule is a list of `num_columns + 1` offsets in nanoseconds from the
+stroke start: entry n is the time column n is written to the strip,
+the last entry is the end of the last column (time to clear the strip).
+Tables are built before the stroke - the paint loop only looks up entries.
+
+profiles:
+- linear: constant column period.
+- sine: a hand stroke between two turning points is modelled as
+  half a cosine period (slow at the ends, fast in the middle).
+  columns are placed at equal distances in space -
+  so the image is not squashed at the edges.
+"""
+
+import math
+
+NS_PER_SECOND = 1_000_000_000
+
+
+def schedule_linear(num_columns, duration, *, delay=0.0):
+    """
+    Constant column period.
+
+    Arguments:
+        num_columns (int) : columns to paint.
+        duration (float) : time for all columns in seconds.
+        delay (float) : time in seconds before the first column.
+    """
+    if num_columns <= 0:
+        return [0]
+    interval = duration / num_columns
+    return [
+        int((delay + column * interval) * NS_PER_SECOND)
+        for column in range(num_columns + 1)
+    ]
+
+
+def schedule_sine(num_columns, duration, *, stroke_fill=0.8, latency=0.0):
+    """
+    Column times for a sinusoidal stroke.
+
+    position over time: x(t) = (1 - cos(pi * t / duration)) / 2
+    → column time: t(x) = duration / pi * acos(1 - 2 * x)
+
+    Arguments:
+        num_columns (int) : columns to paint.
+        duration (float) : stroke duration (turning point to turning point)
+            in seconds.
+        stroke_fill (float) : part of the stroke distance used by the image
+            (0..1). the image is centered - the slowest parts
+            near the turning points stay dark.
+        latency (float) : time in seconds between the turning point and the
+            stroke start (paint call). subtracted from all entries.
+    """
+    if num_columns <= 0:
+        return [0]
+    stroke_fill = min(max(stroke_fill, 0.01), 1.0)
+    x_start = (1.0 - stroke_fill) / 2
+    column_width = stroke_fill / num_columns
+    factor = duration / math.pi
+    schedule = []
+    # column n covers x_start + n * column_width .. + column_width
+    for column in range(num_columns + 1):
+        x = x_start + column * column_width
+        t = factor * math.acos(min(max(1.0 - 2.0 * x, -1.0), 1.0)) - latency
+        schedule.append(int(max(t, 0.0) * NS_PER_SECOND))
+    return schedule
+
+
+def interval_min_sine(num_columns, duration, *, stroke_fill=0.8):
+    """
+    Shortest column interval of `schedule_sine` in seconds.
+
+    the stroke is fastest in the middle - the columns next to the center
+    get the least time. (about pi / 2 / stroke_fill times less than
+    duration / num_columns)
+    """
+    if num_columns <= 0:
+        return duration
+    stroke_fill = min(max(stroke_fill, 0.01), 1.0)
+    x_start = (1.0 - stroke_fill) / 2
+    column_width = stroke_fill / num_columns
+    factor = duration / math.pi
+
+    def column_time(x):
+        return factor * math.acos(min(max(1.0 - 2.0 * x, -1.0), 1.0))
+
+    interval = duration
+    for column in (num_columns // 2 - 1, num_columns // 2):
+        if 0 <= column < num_columns:
+            x = x_start + column * column_width
+            interval = min(interval, column_time(x + column_width) - column_time(x))
+    return interval
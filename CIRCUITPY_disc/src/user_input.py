@@ -340,7 +340,9 @@ class UserInput(object):
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def button_update(self):
         # button input
-        if self.button.events.get_into(self.button_event):
+        # empty the queue - the paint loops end a stroke
+        # as long as an event is queued.
+        while self.button.events.get_into(self.button_event):
             self.callback_button(self.button_event)
             # if self.button_event.pressed:
             # if self.button_event.key_number == 0:
@@ -391,6 +393,13 @@ class UserInput(object):
             "you can set some options:\n"
             "- 'mode': toggle system mode [rgblamp | povpainter] ({mode})\n"
             "- 'plot': toggle data plot ({plot})\n"
+            "povpainter:\n"
+            "- 'stats': show paint timing statistics "
+            "('stats reset' / 'stats off')\n"
+            "- 'capture [strokes]': record the SPI stream of the next strokes\n"
+            "- 'calibrate': measure the hardware timing again\n"
+            "- 'tune': find the highest stable SPI baudrate\n"
+            "  (without loopback answer every step with 'y' / 'n')\n"
             # "- 'xy':  ({heater_target: > 7.2f})\n"
             # "- 'pn' select next profil\n"
             # "{profile_list}"
@@ -409,6 +418,8 @@ class UserInput(object):
             self.magicpainter.switch_to_next_mode()
         elif input_string.startswith("plot"):
             self.gesture.plot_data = not self.gesture.plot_data
+        elif self.magicpainter.mode.handle_command(input_string):
+            pass
             # if "rgb" in input_string or "pov" in input_string:
         # elif input_string.startswith("stop"):
         #     self.menu_reflowcycle_stop()
@@ -0,0 +1,118 @@
+# SPDX-FileCopyrightText: 2024 s-light.eu stefan krüger
+# SPDX-License-Identifier: MIT
+
+"""
+benchmark BMP2LED.process conversion modes.
+
+compares the float gamma math (original) with the lookup-table engine.
+copy to the CIRCUITPY drive and run from the REPL:
+    import bmp2led_benchmark
+filesystem needs to be writeable by CircuitPython.
+"""
+
+import sys
+import os
+import gc
+import time
+
+sys.path.append("/src")
+
+from bmp2led import BMP2LED
+
+image_folder = "/images"
+rows = 300
+pixel_count = 144
+brightness = 0.5
+
+
+def benchmark(bmp2led, input_filename, output_filename, msg):
+    print("{} running..".format(msg))
+    gc.collect()
+    start = time.monotonic()
+    rows_written = bmp2led.process(
+        input_filename,
+        output_filename,
+        rows,
+        brightness=brightness,
+        loop=False,
+    )
+    end = time.monotonic()
+    duration = end - start
+    result = {
+        "msg": msg,
+        "rows": rows_written,
+        "duration": duration,
+        "rows_per_second": rows_written / duration,
+    }
+    print(
+        "'{}'  {:>4} rows in {:8.3f}s → {:8.1f} rows/s".format(
+            result["msg"],
+            result["rows"],
+            result["duration"],
+            result["rows_per_second"],
+        )
+    )
+    return result
+
+
+def compare_files(filename_a, filename_b):
+    """count differing bytes and the biggest difference."""
+    diff_count = 0
+    diff_max = 0
+    buffer_a = bytearray(512)
+    buffer_b = bytearray(512)
+    with open(filename_a, "rb") as file_a, open(filename_b, "rb") as file_b:
+        while True:
+            count = file_a.readinto(buffer_a)
+            file_b.readinto(buffer_b)
+            if not count:
+                break
+            for index in range(count):
+                diff = abs(buffer_a[index] - buffer_b[index])
+                if diff:
+                    diff_count += 1
+                    diff_max = max(diff_max, diff)
+    return diff_count, diff_max
+
+
+print("\n" * 20)
+images = BMP2LED(pixel_count=pixel_count).scandir(image_folder)
+input_filename = image_folder + "/" + images[0]
+print("image: '{}'  rows: {}".format(input_filename, rows))
+
+results = []
+results.append(
+    benchmark(
+        BMP2LED(pixel_count=pixel_count, use_lut=False),
+        input_filename,
+        "/led_bench_float.dat",
+        "float gamma",
+    )
+)
+results.append(
+    benchmark(
+        BMP2LED(pixel_count=pixel_count, use_lut=True),
+        input_filename,
+        "/led_bench_lut.dat",
+        "lookup table",
+    )
+)
+
+print()
+print(
+    "speedup: {:>5.2f}x".format(
+        results[1]["rows_per_second"] / results[0]["rows_per_second"]
+    )
+)
+diff_count, diff_max = compare_files("/led_bench_float.dat", "/led_bench_lut.dat")
+print(
+    "output difference: {} of {} bytes differ, max difference {}".format(
+        diff_count,
+        os.stat("/led_bench_float.dat")[6],
+        diff_max,
+    )
+)
+
+os.remove("/led_bench_float.dat")
+os.remove("/led_bench_lut.dat")
+print("done...")
@@ -0,0 +1,133 @@
+# SPDX-FileCopyrightText: 2024 s-light.eu stefan krüger
+# SPDX-License-Identifier: MIT
+
+"""
+benchmark BMP2LED HDR mode against the classic 8-bit output.
+
+generates a dark gray gradient BMP (one row = one strip frame),
+converts it at low brightness with both encoders and reports
+- throughput in rows/s
+- distinct light levels within one row (less = more banding)
+- mean error of the time averaged light output against the ideal value
+copy to the CIRCUITPY drive and run from the REPL:
+    import bmp2led_hdr_benchmark
+filesystem needs to be writeable by CircuitPython.
+"""
+
+import sys
+import os
+import gc
+import time
+
+sys.path.append("/src")
+
+from bmp2led import BMP2LED
+
+pixel_count = 144
+gradient_rows = 8
+rows = 200
+brightness = 0.2
+gamma = 2.4
+color_order = "bgr"
+gradient_filename = "/bench_gradient.bmp"
+output_filename = "/led_bench_hdr.dat"
+
+
+def write_le(file, value, num_bytes):
+    file.write(value.to_bytes(num_bytes, "little"))
+
+
+def write_gradient_bmp(filename):
+    """24-bit BMP with a black to white gradient along the strip."""
+    row_size = (pixel_count * 3 + 3) & ~3
+    row = bytearray(row_size)
+    for pixel in range(pixel_count):
+        value = pixel * 255 // (pixel_count - 1)
+        row[pixel * 3 : pixel * 3 + 3] = bytes((value, value, value))
+    with open(filename, "wb") as file:
+        file.write(b"BM")
+        write_le(file, 54 + row_size * gradient_rows, 4)
+        write_le(file, 0, 4)
+        write_le(file, 54, 4)  # image offset
+        write_le(file, 40, 4)  # header size
+        write_le(file, pixel_count, 4)
+        write_le(file, gradient_rows, 4)
+        write_le(file, 1, 2)  # planes
+        write_le(file, 24, 2)  # bits per pixel
+        write_le(file, 0, 4)  # compression
+        write_le(file, row_size * gradient_rows, 4)
+        write_le(file, 2835, 4)
+        write_le(file, 2835, 4)
+        write_le(file, 0, 4)
+        write_le(file, 0, 4)
+        for _ in range(gradient_rows):
+            file.write(row)
+
+
+def analyse(bmp2led, num_rows):
+    """
+    light output per pixel in units of 1/255 of full scale
+    (channel value * global brightness / 31).
+    """
+    green_offset = 1 + bmp2led.green_index
+    light_sum = [0.0] * pixel_count
+    first_row_levels = set()
+    row_data = bytearray(bmp2led.dotstar_row_size)
+    with open(output_filename, "rb") as file:
+        for row in range(num_rows):
+            file.readinto(row_data)
+            for pixel in range(pixel_count):
+                index = 4 + pixel * 4
+                light = row_data[index + green_offset] * (row_data[index] & 0x1F)
+                light_sum[pixel] += light / 31
+                if row == 0:
+                    first_row_levels.add(light)
+    error_sum = 0.0
+    for pixel in range(pixel_count):
+        value = pixel * 255 // (pixel_count - 1)
+        ideal = ((value * brightness / 255) ** gamma) * 254.999
+        error_sum += abs(light_sum[pixel] / num_rows - ideal)
+    return len(first_row_levels), error_sum / pixel_count
+
+
+def benchmark(msg, hdr):
+    print("{} running..".format(msg))
+    bmp2led = BMP2LED(
+        pixel_count=pixel_count, color_order=color_order, gamma=gamma, hdr=hdr
+    )
+    gc.collect()
+    start = time.monotonic()
+    num_rows = bmp2led.process(
+        gradient_filename,
+        output_filename,
+        rows,
+        brightness=brightness,
+        loop=True,
+    )
+    duration = time.monotonic() - start
+    levels, error = analyse(bmp2led, num_rows)
+    result = {
+        "msg": msg,
+        "rows_per_second": num_rows / duration,
+        "levels": levels,
+        "error": error,
+    }
+    print(
+        "'{:<8}'  {:8.1f} rows/s  {:>4} levels/row  mean error {:8.5f}".format(
+            result["msg"],
+            result["rows_per_second"],
+            result["levels"],
+            result["error"],
+        )
+    )
+    return result
+
+
+print("\n" * 20)
+print("brightness: {}  gamma: {}".format(brightness, gamma))
+write_gradient_bmp(gradient_filename)
+benchmark("classic", hdr=False)
+benchmark("hdr", hdr=True)
+os.remove(output_filename)
+os.remove(gradient_filename)
+print("done...")
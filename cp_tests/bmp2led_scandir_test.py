@@ -0,0 +1,104 @@
+# SPDX-FileCopyrightText: 2024 Stefan Krüger s-light.eu
+# SPDX-License-Identifier: MIT
+# source https://github.com/s-light/cp_magic_painter/
+
+
+"""
+checks for BMP2LED.scandir.
+
+copy to the CIRCUITPY drive and run from the REPL:
+    import bmp2led_scandir_test
+or on the host (NumPy in place of ulab):
+    python3 cp_tests/bmp2led_scandir_test.py
+"""
+
+import os
+import struct
+import sys
+
+sys.path.append("/src")
+try:
+    import ulab  # noqa: F401
+except ImportError:
+    # host - use the device code with the ulab shim of the compile tool
+    base_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    sys.path.append(os.path.join(base_path, "CIRCUITPY_disc", "src"))
+    sys.path.append(os.path.join(base_path, "tools"))
+    from bmp2led_compile import install_ulab_shim
+
+    install_ulab_shim()
+
+from bmp2led import BMP2LED
+
+# scratch folder for test images (needs a writeable filesystem)
+test_folder = "/scandir_test"
+try:
+    import tempfile
+
+    test_folder = tempfile.mkdtemp()
+except ImportError:
+    pass
+
+
+def write_bmp(filename, width, height):
+    """black 24 bit BMP."""
+    row_size = (width * 3 + 3) & ~3
+    with open(filename, "wb") as file:
+        file.write(b"BM")
+        file.write(struct.pack("<IHHI", 54 + row_size * height, 0, 0, 54))
+        file.write(struct.pack("<IiiHHI", 40, width, height, 1, 24, 0))
+        file.write(b"\0" * 20)
+        file.write(b"\0" * (row_size * height))
+
+
+def remove_tree(path):
+    for entry in os.listdir(path):
+        filename = path + "/" + entry
+        if os.stat(filename)[0] & 0x4000:
+            remove_tree(filename)
+        else:
+            os.remove(filename)
+    os.rmdir(path)
+
+
+def test_scandir_missing_folder():
+    """a missing image folder is an empty list - not an OSError."""
+    bmp2led = BMP2LED(pixel_count=36)
+    images = bmp2led.scandir("/this_folder_does_not_exist")
+    assert images == [], images
+    assert bmp2led.image_specs == {}, bmp2led.image_specs
+    print("test_scandir_missing_folder: ok")
+
+
+def test_specs_same_name_other_folder():
+    """specs of a scanned name must not be used for a file in another folder."""
+    images = test_folder + "/images"
+    animation = test_folder + "/animation"
+    for path in (test_folder, images, animation):
+        try:
+            os.mkdir(path)
+        except OSError:
+            pass
+    write_bmp(images + "/frame1.bmp", 4, 3)
+    write_bmp(animation + "/frame1.bmp", 7, 5)
+    try:
+        bmp2led = BMP2LED(pixel_count=36)
+        assert bmp2led.scandir(images) == ["frame1.bmp"]
+        specs = bmp2led.specs(images + "/frame1.bmp")
+        assert (specs.width, specs.height) == (4, 3), (specs.width, specs.height)
+        specs = bmp2led.specs(animation + "/frame1.bmp")
+        assert (specs.width, specs.height) == (7, 5), (specs.width, specs.height)
+    finally:
+        remove_tree(test_folder)
+    print("test_specs_same_name_other_folder: ok")
+
+
+def run():
+    test_scandir_missing_folder()
+    try:
+        test_specs_same_name_other_folder()
+    except OSError as error:
+        print("test_specs_same_name_other_folder: skipped ({})".format(error))
+
+
+run()
@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: 2024 s-light.eu stefan krüger
+# SPDX-License-Identifier: MIT
+
+"""
+benchmark POVPainter v1 image loading.
+
+compares the old per pixel loader (f.read(3) + 3x pow() per pixel)
+with BMP2LED.read_columns (block readinto + gamma table + ulab transpose).
+both use gamma 2.7 here - so the results can be checked for equality.
+(the old loader additionally pushed a progress frame to the strip after
+every row - this is not included in the timing.)
+copy to the CIRCUITPY drive and run from the REPL:
+    import load_image_v1_benchmark
+"""
+
+import sys
+import gc
+import time
+
+sys.path.append("/src")
+
+from bmp2led import BMP2LED
+
+image_folder = "/images"
+brightness = 0.5
+gamma = 2.7
+
+
+def read_le(s):
+    result = 0
+    shift = 0
+    for byte in bytearray(s):
+        result += byte << shift
+        shift += 8
+    return result
+
+
+def load_legacy(filename):
+    """the old load_image_v1 loop."""
+    with open(filename, "rb") as f:
+        f.read(2)
+        f.read(4)
+        f.read(4)
+        bmpImageoffset = read_le(f.read(4))
+        f.read(4)
+        bmpWidth = read_le(f.read(4))
+        bmpHeight = read_le(f.read(4))
+        rowSize = (bmpWidth * 3 + 3) & ~3
+        # same column layout as read_columns (start frame + pixels + end frame)
+        column_size = BMP2LED.column_frame_size(bmpHeight)
+        image_buffer = bytearray(bmpWidth * column_size)
+        for row in range(bmpHeight):
+            pos = bmpImageoffset + (bmpHeight - 1 - row) * rowSize
+            f.seek(pos)
+            for col in range(bmpWidth):
+                b, g, r = bytearray(f.read(3))
+                order = [b, g, r]
+                idx = col * column_size + 4 + (bmpHeight - row - 1) * 4
+                image_buffer[idx] = 0xFF
+                idx += 1
+                for color in order:
+                    image_buffer[idx] = int(
+                        pow((color * brightness) / 255, gamma) * 255 + 0.5
+                    )
+                    idx += 1
+    return image_buffer, bmpWidth, bmpHeight
+
+
+def load_new(filename):
+    bmp2led = BMP2LED(pixel_count=144, color_order="bgr", gamma=gamma)
+    return bmp2led.read_columns(filename, brightness=brightness)
+
+
+def speed_test(fn, filename, msg):
+    print("{} running..".format(msg))
+    gc.collect()
+    start = time.monotonic()
+    result = fn(filename)
+    duration = time.monotonic() - start
+    print("'{:<14}'  needs {:10.3f}ms".format(msg, duration * 1000))
+    return result, duration
+
+
+print("\n" * 20)
+images = BMP2LED(pixel_count=144).scandir(image_folder)
+for image in images:
+    filename = image_folder + "/" + image
+    print(42 * "*")
+    print(filename)
+    (buffer_legacy, width, height), duration_legacy = speed_test(
+        load_legacy, filename, "legacy"
+    )
+    (buffer_new, _, _), duration_new = speed_test(load_new, filename, "read_columns")
+    print(
+        "{}x{}  speedup: {:>6.1f}x  identical: {}".format(
+            width,
+            height,
+            duration_legacy / duration_new,
+            buffer_legacy == buffer_new,
+        )
+    )
+    buffer_legacy = None
+    buffer_new = None
+    gc.collect()
+
+print("done...")
@@ -0,0 +1,97 @@
+# SPDX-FileCopyrightText: 2024 s-light.eu stefan krüger
+# SPDX-License-Identifier: MIT
+
+"""
+benchmark paint_v2 bulk reads.
+
+plays a generated LED data file through FileFrameStore
+(the reader paint_v2 uses) with different rows per readinto()
+and reports rows/s - file read only and file read + SPI write.
+batch size 1 is the old seek + readinto per row.
+copy to the CIRCUITPY drive and run from the REPL:
+    import paint_v2_batch_benchmark
+filesystem needs to be writeable by CircuitPython.
+"""
+
+import sys
+import os
+import gc
+import time
+
+import board
+import busio
+
+sys.path.append("/src")
+
+from bmp2led import BMP2LED
+from povpainter import FileFrameStore
+
+pixel_count = 144
+rows = 300
+batch_sizes = (1, 2, 4, 8, 16, 32)
+data_filename = "/led_bench_batch.dat"
+spi_pins = (board.D11, board.D12)
+baudrate = 12000000
+
+
+def write_data_file(row_size):
+    row_data = bytearray(
+        [0] * 4 + [255, 0, 0, 0] * pixel_count + [255] * ((pixel_count + 15) // 16)
+    )
+    with open(data_filename, "wb") as file:
+        for _ in range(rows):
+            file.write(row_data)
+
+
+def benchmark(batch_rows, spi=None):
+    gc.collect()
+    store = FileFrameStore(
+        data_filename,
+        frame_count=rows,
+        pixel_count=pixel_count,
+        page_frames=batch_rows,
+        frame_size=row_size,
+    )
+    store.prepare(False)
+    frame = store.frame
+    gc.disable()
+    start = time.monotonic_ns()
+    for row in range(rows):
+        led_row = frame(row)
+        if spi:
+            spi.write(led_row)
+    duration = (time.monotonic_ns() - start) / 1_000_000_000
+    gc.enable()
+    store.close()
+    return rows / duration
+
+
+print("\n" * 20)
+bmp2led = BMP2LED(pixel_count=pixel_count)
+row_size = bmp2led.dotstar_row_size
+print(
+    "row size: {} bytes  cluster size: {} bytes".format(
+        row_size, BMP2LED.cluster_size("/")
+    )
+)
+write_data_file(row_size)
+
+spi = busio.SPI(clock=spi_pins[0], MOSI=spi_pins[1])
+while not spi.try_lock():
+    pass
+spi.configure(baudrate=baudrate)
+
+print("{:>6} {:>12} {:>14}".format("batch", "read rows/s", "+spi rows/s"))
+for batch_rows in batch_sizes:
+    print(
+        "{:>6} {:>12.1f} {:>14.1f}".format(
+            batch_rows,
+            benchmark(batch_rows),
+            benchmark(batch_rows, spi),
+        )
+    )
+
+spi.unlock()
+spi.deinit()
+os.remove(data_filename)
+print("done...")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Stefan Krüger s-light.eu
+# SPDX-License-Identifier: MIT
+# source https://github.com/s-light/cp_magic_painter/
+
+"""
+Batch image compiler - convert BMP images on the computer.
+
+Converts a whole folder of BMP images into the DotStar-ready LED data files
+`paint_v2` plays - byte for byte the same as `BMP2LED.process` produces on
+the device (it is the same code - running with NumPy in place of ulab).
+The files are written together with an `index.json` in the `LEDCache` format.
+Copy the output folder to the CIRCUITPY drive (default `/led_cache`) -
+at boot the POVPainter finds the prebuilt entries and no conversion happens
+on the device.
+
+The conversion parameters need to match the device config
+(`hw.pixel_count`, `hw.pixel_color_order`, `POVPainter.gamma`, ...).
+Prebuilt entries are used even if the device would request a different
+row count.
+
+usage:
+    python3 tools/bmp2led_compile.py --pixel-count 144 --rows 300 \\
+        CIRCUITPY_disc/images CIRCUITPY_disc/led_cache
+
+with `--frozen-module frozen_images.py` additionally a python module with the
+classic (v1) column frames of all images is written. freeze it into the
+firmware and `POVPainter` serves these images from flash without RAM copy
+(`FrozenFrameStore`). the frames are full scale without HDR - so they are
+only used with `brightness_at_paint_time` on and `bmp2led_hdr` off.
+
+needs: numpy
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import types
+
+import numpy
+
+##########################################
+# use device code
+
+
+src_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "CIRCUITPY_disc", "src"
+)
+sys.path.append(src_path)
+
+
+def install_ulab_shim():
+    """provide `ulab.numpy` backed by NumPy."""
+    if "ulab" in sys.modules:
+        return
+    ulab_numpy = types.ModuleType("ulab.numpy")
+    ulab_numpy.__dict__.update(numpy.__dict__)
+    # ulab still has `float` as dtype
+    ulab_numpy.float = numpy.float64
+    ulab = types.ModuleType("ulab")
+    ulab.numpy = ulab_numpy
+    sys.modules["ulab"] = ulab
+    sys.modules["ulab.numpy"] = ulab_numpy
+
+
+# needs to run on import - so it also happens in spawned worker processes.
+install_ulab_shim()
+
+from bmp2led import BMP2LED  # noqa: E402
+from led_cache import LEDCache, file_crc  # noqa: E402
+
+
+##########################################
+# conversion
+
+
+def conversion_key(crc, options):
+    return LEDCache.make_key(
+        crc,
+        brightness=options["brightness"],
+        gamma=options["gamma"],
+        rows=options["rows"],
+        color_order=options["color_order"],
+        loop=options["loop"],
+        hdr=options["hdr"],
+    )
+
+
+def compile_image(job):
+    """convert one image. runs in a worker process."""
+    image_filename, output_filename, options = job
+    bmp2led = BMP2LED(
+        pixel_count=options["pixel_count"],
+        color_order=options["color_order"],
+        gamma=options["gamma"],
+        use_lut=options["use_lut"],
+        hdr=options["hdr"],
+    )
+    start = time.monotonic()
+    num_rows = bmp2led.process(
+        image_filename,
+        output_filename,
+        options["rows"],
+        brightness=options["brightness"],
+        loop=options["loop"],
+    )
+    return image_filename, output_filename, num_rows, time.monotonic() - start
+
+
+def compile_folder(args):
+    options = {
+        "pixel_count": args.pixel_count,
+        "color_order": args.color_order,
+        "gamma": args.gamma,
+        "brightness": args.brightness,
+        "rows": args.rows,
+        "loop": args.loop,
+        "hdr": args.hdr,
+        "use_lut": not args.no_lut,
+    }
+    os.makedirs(args.output_folder, exist_ok=True)
+    cache = LEDCache(path=args.output_folder, writeable=True)
+
+    images = BMP2LED(pixel_count=args.pixel_count).scandir(args.image_folder)
+    print("found {} images in '{}'".format(len(images), args.image_folder))
+
+    jobs = []
+    keys = {}
+    for image in images:
+        image_filename = os.path.join(args.image_folder, image)
+        key = conversion_key(file_crc(image_filename), options)
+        output_filename = cache.filename_for(key)
+        if key in cache.entries and os.path.exists(output_filename) and not args.force:
+            print("  {:<30} up to date".format(image))
+            continue
+        keys[image_filename] = key
+        jobs.append((image_filename, output_filename, options))
+
+    start = time.monotonic()
+    with multiprocessing.Pool(args.jobs) as pool:
+        for image_filename, output_filename, num_rows, duration in (
+            pool.imap_unordered(compile_image, jobs)
+        ):
+            if not num_rows:
+                print("  {:<30} FAILED".format(os.path.basename(image_filename)))
+                continue
+            key = keys[image_filename]
+            cache.add(
+                key,
+                args.device_cache_folder + "/" + LEDCache.file_basename(key),
+                num_rows,
+                prebuilt=True,
+                save=False,
+            )
+            print(
+                "  {:<30} {:>5} rows  {:6.2f}s".format(
+                    os.path.basename(image_filename), num_rows, duration
+                )
+            )
+    cache.save_index()
+    print(
+        "converted {} images in {:.2f}s → '{}'".format(
+            len(jobs), time.monotonic() - start, args.output_folder
+        )
+    )
+    if args.frozen_module:
+        write_frozen_module(args, images)
+
+
+def write_frozen_module(args, images):
+    """python module with v1 column frames (pixel header 0xFF, brightness 1.0)."""
+    bmp2led = BMP2LED(
+        pixel_count=args.pixel_count,
+        color_order=args.color_order,
+        gamma=args.gamma,
+    )
+    with open(args.frozen_module, "w") as file:
+        file.write(
+            "# generated by tools/bmp2led_compile.py - do not edit.\n"
+            "# v1 column frames for POVPainter FrozenFrameStore\n\n"
+            "images = {\n"
+        )
+        for image in images:
+            buffer, width, height = bmp2led.read_columns(
+                os.path.join(args.image_folder, image)
+            )
+            file.write(
+                "    {!r}: {{\n"
+                "        'width': {},\n"
+                "        'height': {},\n"
+                "        'gamma': {!r},\n"
+                "        'color_order': {!r},\n"
+                "        'brightness': 1.0,\n"
+                "        'hdr': False,\n"
+                "        'frames': {!r},\n"
+                "    }},\n".format(
+                    image, width, height, args.gamma, args.color_order, bytes(buffer)
+                )
+            )
+        file.write("}\n")
+    print("frozen module written to '{}'".format(args.frozen_module))
+
+
+##########################################
+# cli
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="convert BMP images to ready-to-play LED data files."
+    )
+    parser.add_argument("image_folder", help="folder with BMP images")
+    parser.add_argument(
+        "output_folder",
+        help="output folder - copy its content to `device-cache-folder`",
+    )
+    parser.add_argument(
+        "--device-cache-folder",
+        default="/led_cache",
+        help="POVPainter.led_cache_folder on the device (default: %(default)s)",
+    )
+    parser.add_argument("--pixel-count", type=int, default=144)
+    parser.add_argument("--color-order", default="bgr")
+    parser.add_argument("--gamma", type=float, default=2.4)
+    parser.add_argument(
+        "--brightness",
+        type=float,
+        default=1.0,
+        help="1.0 for `brightness_at_paint_time` (default: %(default)s)",
+    )
+    parser.add_argument("--rows", type=int, default=300)
+    parser.add_argument("--loop", action="store_true")
+    parser.add_argument("--hdr", action="store_true")
+    parser.add_argument(
+        "--no-lut", action="store_true", help="use float gamma math conversion"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="worker processes (default: number of cpu cores)",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="also convert up to date images"
+    )
+    parser.add_argument(
+        "--frozen-module",
+        default=None,
+        help="also write v1 column frames as python module (to freeze into firmware)",
+    )
+    args = parser.parse_args()
+    compile_folder(args)
+
+
+if __name__ == "__main__":
+    main()
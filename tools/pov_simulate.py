@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# SPDX-FileCopyrightText: 2024 Stefan Krüger s-light.eu
+# SPDX-License-Identifier: MIT
+# source https://github.com/s-light/cp_magic_painter/
+
+"""
+Long exposure POV simulator - what a camera would see.
+
+Reads the SPI stream the POVPainter wrote to the strip
+(capture file of `spi_capture.SPICapture` - serial command `capture`),
+moves the strip along a stroke motion model and composites all strips
+into one long exposure PNG. Additionally the column spacing
+(distance between the positions where columns start) and the throughput
+are reported per stroke - so timing changes can be compared
+without a camera and a dark room.
+
+the motion model:
+    linear: constant speed over the stroke.
+    sine: half a cosine period between the turning points
+        (same model as `stroke_timing.schedule_sine`).
+the stroke starts `--latency` seconds before the stroke mark and takes
+`--stroke-duration` seconds (default: the duration recorded with the mark,
+otherwise the time from the mark to the last write).
+
+without hardware `--from-bmp` synthesizes the stream paint_v1 would write
+for an image (ideal timing on the column schedule - plus `--write-us`
+per frame). usable as regression check in CI.
+
+usage:
+    python3 tools/pov_simulate.py --pixel-count 144 spi_capture.bin exposure.png
+    python3 tools/pov_simulate.py --pixel-count 36 --profile sine \\
+        --from-bmp CIRCUITPY_disc/images/camel.bmp sim.bin exposure.png
+
+the PNG is written with zlib from the standard library.
+
+needs: numpy
+"""
+
+import argparse
+import json
+import math
+import os
+import struct
+import sys
+import zlib
+
+import numpy
+
+##########################################
+# use device code
+
+
+src_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "CIRCUITPY_disc", "src"
+)
+sys.path.append(src_path)
+
+from spi_capture import (  # noqa: E402
+    MAGIC,
+    RECORD_HEADER,
+    RECORD_STROKE_BACKWARD,
+    RECORD_STROKE_FORWARD,
+    RECORD_WRITE,
+)
+import stroke_timing  # noqa: E402
+
+NS_PER_SECOND = 1_000_000_000
+
+
+##########################################
+# capture file
+
+
+def read_capture(filename):
+    """list of (type, time stamp ns, data) records."""
+    header_size = struct.calcsize(RECORD_HEADER)
+    records = []
+    with open(filename, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("'{}' is no SPI capture file.".format(filename))
+        while True:
+            header = file.read(header_size)
+            if len(header) < header_size:
+                break
+            record_type, timestamp, length = struct.unpack(RECORD_HEADER, header)
+            records.append((record_type, timestamp, file.read(length)))
+    return records
+
+
+def write_capture(filename, records):
+    with open(filename, "wb") as file:
+        file.write(MAGIC)
+        for record_type, timestamp, data in records:
+            file.write(struct.pack(RECORD_HEADER, record_type, timestamp, len(data)))
+            file.write(data)
+
+
+def split_strokes(records):
+    """
+    Group the writes by stroke marks.
+
+    Returns: list of dicts with `backwards`, `start_ns`, `duration`
+    (seconds from the mark - None if unknown) and `writes` (time stamp, data).
+    """
+    strokes = []
+    stroke = None
+    for record_type, timestamp, data in records:
+        if record_type in (RECORD_STROKE_FORWARD, RECORD_STROKE_BACKWARD):
+            (duration_us,) = struct.unpack("<I", data)
+            stroke = {
+                "backwards": record_type == RECORD_STROKE_BACKWARD,
+                "start_ns": timestamp,
+                "duration": duration_us / 1_000_000 or None,
+                "writes": [],
+            }
+            strokes.append(stroke)
+        elif record_type == RECORD_WRITE:
+            if stroke is None:
+                # writes before the first mark
+                stroke = {
+                    "backwards": False,
+                    "start_ns": timestamp,
+                    "duration": None,
+                    "writes": [],
+                }
+                strokes.append(stroke)
+            stroke["writes"].append((timestamp, data))
+    return [stroke for stroke in strokes if stroke["writes"]]
+
+
+def decode_frame(data, pixel_count, color_order):
+    """
+    Light of one strip frame.
+
+    Returns: float array (pixel_count, 3) rgb 0..1
+    (including the 5 bit global brightness) - None if `data` is no
+    complete strip frame.
+    """
+    if len(data) < 4 + 4 * pixel_count or data[:4] != b"\x00\x00\x00\x00":
+        return None
+    pixels = numpy.frombuffer(data, dtype=numpy.uint8, count=4 * pixel_count, offset=4)
+    pixels = pixels.reshape((pixel_count, 4))
+    if numpy.any(pixels[:, 0] & 0xE0 != 0xE0):
+        return None
+    level = (pixels[:, 0] & 0x1F) / 31
+    rgb = numpy.empty((pixel_count, 3))
+    for channel, name in enumerate("rgb"):
+        rgb[:, channel] = pixels[:, 1 + color_order.find(name)] / 255 * level
+    return rgb
+
+
+##########################################
+# simulation
+
+
+def position(t, duration, profile):
+    """stroke position 0..1 at time `t` (seconds from the turning point)."""
+    x = numpy.clip(t / duration, 0.0, 1.0)
+    if profile == "sine":
+        return (1 - numpy.cos(math.pi * x)) / 2
+    return x
+
+
+def stroke_duration(stroke, args):
+    if args.stroke_duration:
+        return args.stroke_duration
+    if stroke["duration"]:
+        return stroke["duration"]
+    last_ns = stroke["writes"][-1][0]
+    return (last_ns - stroke["start_ns"]) / NS_PER_SECOND + args.latency
+
+
+def simulate_stroke(stroke, args):
+    """
+    Exposure of one stroke.
+
+    every frame stays on the strip until the next write (or the stroke end).
+    the time on the strip is sampled with `--substeps` points and added to
+    the image column under the strip at that time.
+
+    Returns: exposure (width, pixel_count, 3) and stroke statistics.
+    """
+    width = args.width
+    duration = stroke_duration(stroke, args)
+    start_s = stroke["start_ns"] / NS_PER_SECOND - args.latency
+    end_s = start_s + duration
+    exposure = numpy.zeros((width, args.pixel_count, 3))
+    writes = stroke["writes"]
+    column_positions = []
+    frames = 0
+    last_dark = False
+    for index, (timestamp, data) in enumerate(writes):
+        rgb = decode_frame(data, args.pixel_count, args.color_order)
+        if rgb is None:
+            continue
+        frames += 1
+        t_start = timestamp / NS_PER_SECOND
+        if index + 1 < len(writes):
+            t_end = writes[index + 1][0] / NS_PER_SECOND
+        else:
+            t_end = max(end_s, t_start)
+        x_start = position(t_start - start_s, duration, args.profile)
+        if stroke["backwards"]:
+            x_start = 1 - x_start
+        column_positions.append(float(x_start) * width)
+        last_dark = not rgb.any()
+        if t_end <= t_start:
+            continue
+        samples = (numpy.arange(args.substeps) + 0.5) / args.substeps
+        t = t_start + samples * (t_end - t_start) - start_s
+        x = position(t, duration, args.profile)
+        if stroke["backwards"]:
+            x = 1 - x
+        columns = numpy.clip((x * width).astype(int), 0, width - 1)
+        dt = (t_end - t_start) / args.substeps
+        numpy.add.at(exposure, columns, rgb * dt)
+    if last_dark:
+        # clear_strip after the image
+        column_positions.pop()
+        frames -= 1
+    # a frame that stays exactly one image column on the strip
+    # (at constant speed) gets its full value.
+    exposure *= width / duration
+
+    timestamps = numpy.array([timestamp for timestamp, _ in writes])
+    intervals = numpy.diff(timestamps) / 1000
+    spacing = numpy.diff(numpy.array(column_positions))
+    if stroke["backwards"]:
+        spacing = -spacing
+    span_s = (timestamps[-1] - timestamps[0]) / NS_PER_SECOND if len(writes) > 1 else 0
+    stats = {
+        "backwards": stroke["backwards"],
+        "duration": duration,
+        "writes": len(writes),
+        "frames": frames,
+        "columns": len(column_positions),
+        "bytes": sum(len(data) for _, data in writes),
+        "frames_per_second": frames / span_s if span_s else 0.0,
+        "bytes_per_second": sum(len(data) for _, data in writes) / span_s
+        if span_s
+        else 0.0,
+        "write_interval_us_mean": float(intervals.mean()) if len(intervals) else 0.0,
+        "write_interval_us_max": float(intervals.max()) if len(intervals) else 0.0,
+        "image_start": column_positions[0] if column_positions else 0.0,
+        "image_end": column_positions[-1] if column_positions else 0.0,
+    }
+    if len(spacing):
+        stats.update(
+            {
+                "spacing_mean": float(spacing.mean()),
+                "spacing_std": float(spacing.std()),
+                "spacing_min": float(spacing.min()),
+                "spacing_max": float(spacing.max()),
+                # relative spacing error - 0 for perfectly even columns
+                "spacing_cv": float(spacing.std() / spacing.mean())
+                if spacing.mean()
+                else 0.0,
+            }
+        )
+    return exposure, stats
+
+
+def render_image(exposures, args):
+    """
+    PNG pixels (rows, width, 3) uint8.
+
+    strip pixel 0 is at the bottom. all strokes are averaged
+    (forward and backward strokes on top of each other) -
+    with `--stack` every stroke gets its own band.
+    """
+    if args.stack:
+        bands = exposures
+    else:
+        bands = [sum(exposures) / len(exposures)]
+    rows = []
+    for exposure in bands:
+        # (width, pixel, rgb) → (row, width, rgb) - pixel 0 at the bottom
+        band = numpy.transpose(exposure, (1, 0, 2))[::-1]
+        band = numpy.repeat(band, args.pixel_scale, axis=0)
+        rows.append(band)
+    image = numpy.concatenate(rows, axis=0)
+    image = numpy.clip(image * args.exposure, 0.0, 1.0)
+    # undo the LED gamma - so the result looks like the source image
+    image = image ** (1 / args.gamma)
+    return (image * 255 + 0.5).astype(numpy.uint8)
+
+
+def write_png(filename, image):
+    """8 bit RGB PNG - only zlib from the standard library."""
+    height, width, _ = image.shape
+
+    def chunk(kind, data):
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+        )
+
+    # filter type 0 (none) per row
+    raw = b"".join(b"\x00" + image[row].tobytes() for row in range(height))
+    with open(filename, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        # 8 bit, color type 2 (rgb)
+        header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+        file.write(chunk(b"IHDR", header))
+        file.write(chunk(b"IDAT", zlib.compress(raw, 9)))
+        file.write(chunk(b"IEND", b""))
+
+
+##########################################
+# synthetic capture
+
+
+def synthesize(args):
+    """
+    SPI stream of paint_v1 for `--from-bmp` - one forward and one backward
+    stroke on the column schedule (see POVPainter.column_schedule).
+    """
+    from bmp2led_compile import install_ulab_shim
+
+    install_ulab_shim()
+    from bmp2led import BMP2LED
+
+    bmp2led = BMP2LED(
+        pixel_count=args.pixel_count, color_order=args.color_order, gamma=args.gamma
+    )
+    buffer, width, height = bmp2led.read_columns(args.from_bmp)
+    if height != args.pixel_count:
+        raise ValueError(
+            "image height {} != --pixel-count {}".format(height, args.pixel_count)
+        )
+    frame_size = BMP2LED.column_frame_size(height)
+    frames = [
+        bytes(buffer[index * frame_size : (index + 1) * frame_size])
+        for index in range(width)
+    ]
+    off = bytearray(frame_size)
+    BMP2LED.set_pixel_headers(off, height, 0xFF)
+    duration = args.stroke_duration or 0.5
+    if args.profile == "sine":
+        schedule = stroke_timing.schedule_sine(
+            width, duration, stroke_fill=args.stroke_fill, latency=args.latency
+        )
+    else:
+        schedule = stroke_timing.schedule_linear(width, duration - args.latency)
+    write_ns = int(args.write_us * 1000)
+    records = []
+    time_ns = NS_PER_SECOND
+    for backwards in (False, True):
+        record_type = RECORD_STROKE_BACKWARD if backwards else RECORD_STROKE_FORWARD
+        records.append(
+            (record_type, time_ns, struct.pack("<I", int(duration * 1_000_000)))
+        )
+        order = frames[::-1] if backwards else frames
+        ready_ns = time_ns
+        for index, frame in enumerate(order):
+            # a late write starts when the previous one is done
+            write_start = max(time_ns + schedule[index], ready_ns)
+            records.append((RECORD_WRITE, write_start, frame))
+            ready_ns = write_start + write_ns
+        # clear_strip at the end of the schedule
+        clear_ns = max(time_ns + schedule[-1], ready_ns)
+        records.append((RECORD_WRITE, clear_ns, bytes(off)))
+        time_ns += int(duration * NS_PER_SECOND)
+    return records
+
+
+##########################################
+# main
+
+
+def print_stats(all_stats):
+    print(
+        "{:>3} {:>4} {:>7} {:>7} {:>9} {:>8} {:>8} {:>8} {:>7} {:>13}".format(
+            "#",
+            "dir",
+            "frames",
+            "fps",
+            "kB/s",
+            "spacing",
+            "min",
+            "max",
+            "cv",
+            "image",
+        )
+    )
+    for index, stats in enumerate(all_stats):
+        print(
+            "{:>3} {:>4} {:>7} {:>7.0f} {:>9.1f} {:>8.3f} {:>8.3f} {:>8.3f} {:>7.3f} "
+            "{:>6.1f}..{:<6.1f}".format(
+                index,
+                "<--" if stats["backwards"] else "-->",
+                stats["frames"],
+                stats["frames_per_second"],
+                stats["bytes_per_second"] / 1000,
+                stats.get("spacing_mean", 0.0),
+                stats.get("spacing_min", 0.0),
+                stats.get("spacing_max", 0.0),
+                stats.get("spacing_cv", 0.0),
+                stats["image_start"],
+                stats["image_end"],
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="render captured POV SPI streams as long exposure image"
+    )
+    parser.add_argument("capture_file", help="SPI capture (see spi_capture.py)")
+    parser.add_argument("output_png", help="long exposure image to write")
+    parser.add_argument("--pixel-count", type=int, default=144)
+    parser.add_argument("--color-order", default="bgr")
+    parser.add_argument(
+        "--gamma", type=float, default=2.4, help="LED gamma (undone for the PNG)"
+    )
+    parser.add_argument("--profile", choices=("linear", "sine"), default="linear")
+    parser.add_argument(
+        "--stroke-duration",
+        type=float,
+        default=None,
+        help="seconds per stroke (default: from the capture)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.004,
+        help="seconds between turning point and stroke mark",
+    )
+    parser.add_argument(
+        "--stroke-fill",
+        type=float,
+        default=0.8,
+        help="image part of the stroke (--from-bmp with sine profile)",
+    )
+    parser.add_argument(
+        "--width", type=int, default=400, help="PNG pixels along the stroke"
+    )
+    parser.add_argument(
+        "--pixel-scale", type=int, default=2, help="PNG rows per strip pixel"
+    )
+    parser.add_argument("--substeps", type=int, default=16)
+    parser.add_argument(
+        "--exposure", type=float, default=1.0, help="brightness factor for the PNG"
+    )
+    parser.add_argument(
+        "--stack", action="store_true", help="one band per stroke (no overlay)"
+    )
+    parser.add_argument(
+        "--from-bmp",
+        default=None,
+        help="write a synthetic capture for this BMP to capture_file first",
+    )
+    parser.add_argument(
+        "--write-us",
+        type=float,
+        default=0.0,
+        help="time per frame write for --from-bmp",
+    )
+    parser.add_argument(
+        "--json", default=None, help="write the stroke statistics to this file"
+    )
+    args = parser.parse_args()
+
+    if args.from_bmp:
+        write_capture(args.capture_file, synthesize(args))
+    strokes = split_strokes(read_capture(args.capture_file))
+    if not strokes:
+        print("no writes in '{}'".format(args.capture_file))
+        return 1
+    exposures = []
+    all_stats = []
+    for stroke in strokes:
+        exposure, stats = simulate_stroke(stroke, args)
+        exposures.append(exposure)
+        all_stats.append(stats)
+    write_png(args.output_png, render_image(exposures, args))
+    print_stats(all_stats)
+    print("written '{}'".format(args.output_png))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(all_stats, file, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())